@@ -1,383 +1,435 @@
-import copy
-import random
+import threading
+import time
 
-from helperClass.constants import P1_COLOR, P2_COLOR
+from helperClass.cache import SearchCache
+from helperClass.engine import P2, NO_MOVE, ADJACENT, decode_move
+from helperClass.genetic import GeneticSearch
+from helperClass.mcts import MonteCarloSearch
+from helperClass.stats import SearchStats, NODE, LEAF, CUTOFF, RESULT
+from helperClass.symmetry import IDENTITY, canonical_key, transform_entry
+from helperClass.tablebase import Tablebase, UNKNOWN, DRAW, is_win
+from helperClass.transposition import EXACT, LOWER, UPPER, WIN_SCORE
 
+MAX_PLY = 64
 
-class Automa:
-    def __init__(self, board):
-        self.copy_board = None
-        self.board = board
-        self.genetic_move = []
-        self.cnt = 0
+# Move ordering keys, history scores stay well below ORDER_KILLER
+ORDER_HASH = 1 << 40
+ORDER_CAPTURE = 1 << 32
+ORDER_KILLER = 1 << 30
+ORDER_SUICIDE = -(1 << 40)
 
-    @staticmethod
-    def calculate_piece_score(piece) -> int:
-        # Central squares are worth 2, 1 less for each side on edge of board (making corner squares 0)
-
-        if piece.row == -1:
-            return 0
-        curr_score = 2
-        if piece.row == 1 or piece.row == 5:
-            curr_score -= 1
-        if piece.col == 1 or piece.col == 5:
-            curr_score -= 1
-        return curr_score
+# Share table entries between positions that are mirror images or colour-swapped, see helperClass.symmetry. Off by
+# default: it saves 4-8% of nodes but canonicalizing every node costs more time than that.
+SYMMETRY = False
 
-    def calculate_score(self, depth) -> float | int:
+# Engines find_move() can run. Alpha-beta (MINMAX) searches to the difficulty as depth, the others ignore it.
+MINMAX, GENETIC, MONTE_CARLO = "minmax", "genetic", "mcts"
 
-        # Victories outweigh other possible scores, but earlier victories are better
-        if self.board.p2_score == 2:
-            return 100 + depth
+# Pondering grows an MCTS tree to at most this many times a normal search
+PONDER_TREE_FACTOR = 20
 
-        if self.board.p1_score == 2:
-            return -100 - depth
 
-        score = 0
+def evaluate(position, depth=0) -> float | int:
+    # Static evaluation from P2's (the CPU's) point of view, shared by minmax leaves and the GA's fitness. The
+    # centrality term is maintained by the position as pieces move, so this is constant time.
 
-        if self.board.p1_score == 1:
-            score -= 10
+    # Victories outweigh other possible scores, but earlier victories are better
+    if position.p2_score == 2:
+        return 100 + depth
 
-        if self.board.p2_score == 1:
-            score += 10
+    if position.p1_score == 2:
+        return -100 - depth
 
-        for piece in self.board.p1_pieces:
-            print("row col p1")
-            print(piece.row, piece.col)
-            score -= self.calculate_piece_score(piece)
-            print("score row col p1")
-            print(score)
+    score = position.placement
 
-        for piece in self.board.p2_pieces:
-            score += self.calculate_piece_score(piece)
+    if position.p1_score == 1:
+        score -= 10
 
-        # Being next to the Hole is an added vulnerability
-        for neighbor in ((-1, 0), (1, 0), (0, -1), (0, 1)):
-            row, col = self.board.hole_piece.row + neighbor[0], self.board.hole_piece.col + neighbor[1]
-            if self.board.board[row][col] and self.board.board[row][col].color == P1_COLOR:
-                score += 1
-            if self.board.board[row][col] and self.board.board[row][col].color == P2_COLOR:
-                score -= 1
+    if position.p2_score == 1:
+        score += 10
 
-        return score
+    # Being next to the Hole is an added vulnerability
+    adjacent = ADJACENT[position.hole]
+    return score + (position.p1 & adjacent).bit_count() - (position.p2 & adjacent).bit_count()
 
-    def minmax(self, depth: int, maxplayer: bool, alpha: float = float("-inf"), beta: float = float("inf")):
-        if depth == 0 or self.board.p1_score == 2 or self.board.p2_score == 2:
-            return self.calculate_score(depth), None
 
-        self.cnt += 1
-        best_move = None
-        current_max = float("-inf")
-        current_min = float("inf")
-        move_candidates = []
-
-        if maxplayer:
-            pieces = self.board.p2_pieces
-            print("cpu assumption")
-        else:
-            pieces = self.board.p1_pieces
-            print("human assumption")
-        pieces = pieces + [self.board.hole_piece]
-
-        for piece in pieces:
-
-            print(piece.row, piece.col)
-
-            if piece.row == -1:
-                continue
-            for neighbor in ((-1, 0), (1, 0), (0, -1), (0, 1)):
-                row, col = piece.row + neighbor[0], piece.col + neighbor[1]
-                if not (self.board.is_out_of_bounds(row, col) or self.board.board[row][col] == self.board.hole_piece):
-                    move_candidates.append((piece.row, piece.col, row, col))
-        # print("possible move:")
-        # print(move_candidates)
-        if maxplayer:
-            for start_row, start_col, target_row, target_col in move_candidates:
-
-                move = self.board.try_move(start_row, start_col, target_row, target_col)
-                # print("move_cpu: ", move)
-                if move:
-                    state = self.board.save_state(move)
-                    # print("state_cpu:", state)
-                    if self.board.take_turn(start_row, start_col, target_row, target_col, True):
-                        if not best_move:
-                            best_move = (start_row, start_col, target_row, target_col)
-                        score, _ = self.minmax(depth - 1, not maxplayer, alpha, beta)
-
-                        # print("score_cpu: ", score)
-                        self.board.restore_state(state)
-                        # print("max: ", current_max)
-                        if score > current_max:
-                            current_max = score
-                            best_move = (start_row, start_col, target_row, target_col)
-                            alpha = max(score, alpha)
-                            if score >= beta:
-                                break
-            # print("curr_max_final", current_max)
-            # print("best_move", best_move)
-            return current_max, best_move
+class SearchTimeout(Exception):
+    pass
 
 
-        else:
-            for start_row, start_col, target_row, target_col in move_candidates:
-                move = self.board.try_move(start_row, start_col, target_row, target_col)
-                # print("move_human")
-                if move:
-                    state = self.board.save_state(move)
-                    # print("state_human")
-                    if self.board.take_turn(start_row, start_col, target_row, target_col, True):
-                        score, _ = self.minmax(depth - 1, not maxplayer, alpha, beta)
-                        # print("score_human: ", score)
-                        self.board.restore_state(state)
-                        # print("cur_min: ", current_min)
-                        if score < current_min:
-                            current_min = score
-                            beta = min(score, beta)
-                            if score <= alpha:
-                                break
-            # print("cur_min: ", current_min)
-            return current_min, None
-
-    def initializePopulation(self):
-
-        population_state = []
-        for i in range(2):
-            if i == 0:
-                pieces = self.board.p2_pieces
-                turn = "p2"
-            else:
-                turn = "p1"
-                pieces = self.board.p1_pieces
-
-            move_candidates = []
-
-            pieces = pieces + [self.board.hole_piece]
-            for piece in pieces:
-                if piece.row == -1:
-                    continue
-                for neighbor in ((-1, 0), (1, 0), (0, -1), (0, 1)):
-                    row, col = piece.row + neighbor[0], piece.col + neighbor[1]
-                    if not (self.board.is_out_of_bounds(row, col) or self.board.board[row][
-                        col] == self.board.hole_piece):
-                        move_candidates.append((piece.row, piece.col, row, col))
-
-            for start_row, start_col, target_row, target_col in move_candidates:
-                move = self.board.try_move(start_row, start_col, target_row, target_col)
-                data = []
-                if move:
-                    state = self.board.save_state(move)
-                    if self.board.take_turn(start_row, start_col, target_row, target_col, True):
-                        # print("after turn:")
-                        # self.initializePopulation(depth-1)
-
-                        print(start_row, start_col, target_row, target_col, turn)
-                        data.append([start_row, start_col, target_row, target_col, turn])
-                        self.copy_board = copy.deepcopy(self.board)
-                        data.append(self.copy_board)
-                        population_state.append(data)
-                        self.board.restore_state(state)
-
-        return population_state
-
-    def fitness(self, brd):
-        if brd.p2_score == 2:
-            return 100
-
-        if brd.p1_score == 2:
-            return -100
-
-        score = 0
-        if brd.p1_score == 1:
-            score -= 10
-
-        if brd.p2_score == 1:
-            score += 10
-
-        for piece in brd.p1_pieces:
-            # print("row col p1")
-            # print(piece.row, piece.col)
-            score -= self.calculate_piece_score(piece)
-            # print("score row col p1")
-            # print(score)
-
-        for piece in brd.p2_pieces:
-            # print("row col p2")
-            # print(piece.row, piece.col)
-            score += self.calculate_piece_score(piece)
-            # print("score row col p2")
-            # print(score)
-
-        # Being next to the Hole is an added vulnerability
-        for neighbor in ((-1, 0), (1, 0), (0, -1), (0, 1)):
-            row, col = brd.hole_piece.row + neighbor[0], brd.hole_piece.col + neighbor[1]
-            if brd.board[row][col] and brd.board[row][col].color == P1_COLOR:
-                score += 1
-            if brd.board[row][col] and brd.board[row][col].color == P2_COLOR:
-                score -= 1
-
-        return score
-
-    def selection(self, population):
-        # score_list = []
-        selected = []
-        p2_scorelist = []
-        p1_scorelist = []
-        p2_population = []
-        p1_population = []
-        for data in population:
-            # print(data[0])
-            score = self.fitness(data[1])
-            if data[0][4] == "p2":
-                p2_population.append(data)
-                p2_scorelist.append(score)
-            else:
-                p1_scorelist.append(score)
-                p1_population.append(data)
-            # score_list.append(score)
+class SearchCancelled(Exception):
+    pass
 
-        p1_ln = len(p1_population)
-        p2_ln = len(p2_population)
 
-        # print("p1_popu: ", p1_ln)
-        # print(p1_population)
-        # print("p2_popu: ", p2_ln)
-        # print(p2_population)
+class SearchHandle:
+    # A find_move() running on an executor. cancel() makes the search give up within a few dozen nodes.
 
-        for i in range(2):
+    def __init__(self, event, future):
+        self.event = event
+        self.future = future
 
-            if i == 0:
-                ln = p2_ln
-                popu = p2_population
-                score_list = p2_scorelist
-            else:
-                ln = p1_ln
-                popu = p1_population
-                score_list = p1_scorelist
+    def done(self) -> bool:
+        return self.future.done()
 
-            already_selected = []
-            mid = ln // 2
-            cnt = 0
-            while cnt != mid:
-                selected_index = random.sample(range(ln), 2)
-                if selected_index in already_selected:
-                    continue
+    def cancelled(self) -> bool:
+        return self.event.is_set()
 
-                already_selected.append(selected_index)
-                selected_board = [popu[ind] for ind in selected_index]
-                selected_fitness = [score_list[ind] for ind in selected_index]
+    def result(self):
+        return self.future.result()
 
-                if i == 0:
-                    best_fitness_index = selected_fitness.index(max(selected_fitness))
-                else:
-                    best_fitness_index = selected_fitness.index(min(selected_fitness))
+    def cancel(self):
+        self.event.set()
+        self.future.cancel()
 
-                best_chromosome = selected_board[best_fitness_index]
 
-                if best_chromosome in selected:
-                    continue
+class Automa:
+    def __init__(self, board, table_bits: int = 16, stats: SearchStats = None, workers: int = 1,
+                 cache: SearchCache = None, symmetry: bool = SYMMETRY, tablebase: Tablebase = None):
+        self.board = board
+        self.position = board.position.copy()
+        self.cnt = 0
 
-                selected.append(best_chromosome)
-                cnt += 1
+        # Transposition table, evaluations and history. Pass a cache to keep them across games.
+        self.cache = cache if cache is not None else SearchCache(table_bits=table_bits)
+        self.table = self.cache.table
 
-        return selected
+        # Store and look up positions under their symmetry class representative, see table_key()
+        self.symmetry = symmetry
 
-    def crossover(self, parent1, parent2):
+        # Exact results for generated endgame classes, only when a Tablebase is passed in. The classes real games
+        # reach (5v5 down to 4v4) are too big to generate, so this is for analysing smaller synthetic endings; without
+        # one, leaves don't probe at all.
+        self.tablebase = tablebase
+        if tablebase is not None:
+            self.calculate_score = self.calculate_score_with_tablebase
 
-        move = parent1[0]
-        brd = parent2[1]
+        # GENETIC ("Guest") engine
+        self.genetic_search = GeneticSearch(evaluate)
 
-        data = []
-        data.append(move)
+        # MONTE_CARLO engine, its tree is kept from one move to the next
+        self.monte_carlo = MonteCarloSearch(evaluate)
 
-        mv = brd.try_move(move[0], move[1], move[2], move[3])
-        if mv:
-            state = brd.save_state(mv)
-            if brd.take_turn(move[0], move[1], move[2], move[3], True):
-                data.append(copy.deepcopy(brd))
-                brd.restore_state(state)
-                return data
+        # With more than one worker, fixed-depth searches split the root moves across processes
+        # (imported here because it pulls in multiprocessing, which single-process users shouldn't pay for)
+        self.parallel = None
+        if workers > 1:
+            from helperClass.parallel import RootSplitSearch
+            self.parallel = RootSplitSearch(workers, table_bits)
 
-        return None
+        # Optional instrumentation, reset at the start of every find_move() and left for the caller to read
+        self.stats = stats
 
-    def genetic(self):
-        population = self.initializePopulation()
+        # Move ordering state, see order_moves()
+        self.ply = 0
+        self.killers = [[NO_MOVE, NO_MOVE] for _ in range(MAX_PLY)]
+        self.history = self.cache.history
 
-        # print("board test")
-        # print(len(population))
-        # print("populations")
-        # print(population)
+        # Set from another thread to abandon the search in progress, see start_search()
+        self.cancelled = threading.Event()
 
-        selected_poulation = self.selection(population)
-        print("selected population: ", len(selected_poulation))
-        print(selected_poulation)
+        # Iterative deepening state, see iterative_deepening()
+        self.deadline = None
+        self.pv = {}
+        self.depth_reached = 0
 
-        p2 = []
-        p1 = []
+        # Replies searched while P1 was thinking: (depth, score, move) keyed by the position after P1's move
+        self.pondered = {}
+        self.ponder_hits = 0
 
-        for data in selected_poulation:
-            if data[0][4] == "p2":
-                p2.append(data)
+    def calculate_score(self, depth) -> float | int:
+        position = self.position
+        if position.is_over():
+            return evaluate(position, depth)
+        return self.cache.evaluate(position, evaluate)
+
+    def calculate_score_with_tablebase(self, depth) -> float | int:
+        # calculate_score() when there is a tablebase. Its result is exact but the win lies past the horizon, so it
+        # scores like a win found at depth 0.
+        position = self.position
+        if not position.is_over():
+            outcome = self.tablebase.probe(position)
+            if outcome == DRAW:
+                return 0
+            if outcome != UNKNOWN:
+                return WIN_SCORE if is_win(outcome) == (position.turn == P2) else -WIN_SCORE
+        return Automa.calculate_score(self, depth)
+
+    def table_key(self, position) -> (int, int):
+        # return: (key to use in the table, symmetry mapping position to the stored orientation)
+        if self.symmetry:
+            return canonical_key(position)
+        return position.key, IDENTITY
+
+    def table_lookup(self, position, depth: int):
+        # self.table.lookup() for position in its own orientation
+        key, sym = self.table_key(position)
+        found = self.table.lookup(key, depth)
+        if found is not None and sym != IDENTITY:
+            found = transform_entry(*found, sym)
+        return found
+
+    def order_moves(self, position, hash_move: int) -> list:
+        # Hash move first, then pushes knocking an opposing piece out, then this ply's killers, then the rest by
+        # history. Pushes that knock out one of our own pieces go last.
+        killers = self.killers[self.ply] if self.ply < MAX_PLY else ()
+        history = self.history[position.turn]
+        theirs = position.p1 if position.turn == P2 else position.p2
+        keys = {}
+        for move, pushed, target in position.generate_moves(suicides=False):
+            if move == hash_move:
+                keys[move] = ORDER_HASH
+            elif target < 0 and theirs >> pushed[-1] & 1:
+                keys[move] = ORDER_CAPTURE
+            elif target < 0:
+                keys[move] = ORDER_SUICIDE + history[move]
+            elif move in killers:
+                keys[move] = ORDER_KILLER - killers.index(move)
             else:
-                p1.append(data)
-
-        offspring = []
-        for x in p2:
-            for y in p1:
-                move = x[0]
-                bd = y[1]
-                if bd.board[move[0]][move[1]] is None:
-                    continue
-                offspring.append(self.crossover(x, y))
-
-        print("offspring: ", len(offspring))
-        # print(offspring)
-
-        # for data in offspring:
-        #     if data is not None:
-        #         array = [['_' for _ in range(5)] for _ in range(5)]
-        #         print(data[0])
-        #         for p in data[1].p2_pieces:
-        #             if p.row == -1:
-        #                 continue
-        #             array[p.row - 1][p.col - 1] = '#'
-        #         for p in data[1].p1_pieces:
-        #             if p.row == -1:
-        #                 continue
-        #             array[p.row - 1][p.col - 1] = '*'
-        #         h = data[1].hole_piece
-        #         array[h.row - 1][h.col - 1] = 'O'
-        #         print(array)
-
-        scores = []
-        for child in offspring:
-            if child is not None:
-                scores.append((child[0], self.fitness(child[1])))
-
-        print("offspring score: ", len(scores))
-        print(scores)
-        max_tuple = max(scores, key=lambda item: item[1])
-        print(max_tuple)
-
-        # best_index = scores.index(max(scores))
-        # print("score child: ", scores[best_index])
-        # print("best move: ", offspring[best_index])
-
-        # data = offspring[best_index]
-        move = max_tuple[0]
-        best_move = (move[0], move[1], move[2], move[3])
-
-        return max_tuple[1], best_move
-
-    def find_move(self, difficulty):
-        if difficulty == 5:
-            from_gen = self.genetic()
-            print(from_gen)
-            # ga = GeneticAlgorithm(self.board)
-            # return ga.find_move()
-            return from_gen
-
-        perfect = self.minmax(difficulty, True)
-        # print("cnt: ", self.cnt)
-        print("perfect:")
-        print(perfect)
-        return perfect
+                keys[move] = history[move]
+        return sorted(keys, key=keys.__getitem__, reverse=True)
+
+    def record_cutoff(self, position, move: int, depth: int):
+        # Quiet moves that cause a cutoff become killers for this ply and earn history credit
+        pushed, target = position.chain(move)
+        if target < 0:
+            return
+        self.history[position.turn][move] += depth * depth
+        if self.ply < MAX_PLY:
+            killers = self.killers[self.ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+    def minmax(self, depth: int, maxplayer: bool, alpha: float = float("-inf"), beta: float = float("inf")):
+        position = self.position
+        stats = self.stats
+        if depth == 0 or position.is_over():
+            score = self.calculate_score(depth)
+            if stats is not None:
+                stats.leaves[depth] += 1
+                stats.trace and stats.trace(LEAF, depth, position, score)
+            return score, None
+
+        # A transposition may already have settled this position, or at least narrowed the window
+        alpha_orig, beta_orig = alpha, beta
+        hash_move = NO_MOVE
+        key, sym = self.table_key(position)
+        found = self.table.lookup(key, depth)
+        if found is not None and sym != IDENTITY:
+            found = transform_entry(*found, sym)
+        if stats is not None:
+            stats.tt_probes[depth] += 1
+            stats.tt_hits[depth] += found is not None
+        if found is not None:
+            flag, value, hash_move = found
+            move = None if hash_move == NO_MOVE else hash_move
+            if flag == EXACT:
+                return value, move
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            elif flag == UPPER:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value, move
+
+        self.cnt += 1
+        if not self.cnt & 63:
+            if self.cancelled.is_set():
+                raise SearchCancelled
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SearchTimeout
+
+        best_move = None
+        current_max = float("-inf")
+        current_min = float("inf")
+
+        # Along the previous iteration's principal variation its move goes first, otherwise the table's best move
+        hash_move = self.pv.get(position.key, hash_move)
+        moves = self.order_moves(position, hash_move)
+        if stats is not None:
+            stats.nodes[depth] += 1
+            stats.trace and stats.trace(NODE, depth, position, moves[0] if moves else NO_MOVE)
+
+        cutoff = False
+        for move in moves:
+            undo = position.make_move(move)
+            self.ply += 1
+            score, _ = self.minmax(depth - 1, not maxplayer, alpha, beta)
+            self.ply -= 1
+            position.unmake_move(undo)
+
+            if maxplayer:
+                if best_move is None:
+                    best_move = move
+                if score > current_max:
+                    current_max = score
+                    best_move = move
+                    alpha = max(score, alpha)
+                    if score >= beta:
+                        cutoff = True
+                        break
+            elif score < current_min:
+                current_min = score
+                best_move = move
+                beta = min(score, beta)
+                if score <= alpha:
+                    cutoff = True
+                    break
+
+        if cutoff:
+            self.record_cutoff(position, best_move, depth)
+            if stats is not None:
+                stats.cutoffs[depth] += 1
+                stats.trace and stats.trace(CUTOFF, depth, position, best_move)
+
+        value = current_max if maxplayer else current_min
+        if value <= alpha_orig:
+            flag = UPPER
+        elif value >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        entry = flag, value, NO_MOVE if best_move is None else best_move
+        if sym != IDENTITY:
+            entry = transform_entry(*entry, sym)
+        self.table.store(key, depth, *entry)
+
+        return value, best_move
+
+    def principal_variation(self, depth: int) -> dict:
+        # Follow best moves through the transposition table from the current position.
+        # return: the move to play from each position on the line, keyed by position key
+        pv = {}
+        position = self.position.copy()
+        for _ in range(depth):
+            found = self.table_lookup(position, 0)
+            if found is None or found[2] == NO_MOVE:
+                break
+            move = found[2]
+            pv[position.key] = move
+            if not position.play(move):
+                break
+        return pv
+
+    def iterative_deepening(self, max_depth: int, time_limit: float):
+        # Search depth 1, 2, ... until the deadline passes and keep the result of the last finished iteration.
+        # Depth 1 always runs to completion so there is a move to return. An abandoned iteration leaves the
+        # position somewhere down the tree, so keep a copy of the root to go back to.
+        root = self.position.copy()
+        self.pv = {}
+        self.deadline = None
+        result = self.minmax(1, True)
+        self.depth_reached = 1
+        self.deadline = time.perf_counter() + time_limit
+
+        for depth in range(2, max_depth + 1):
+            if time.perf_counter() >= self.deadline:
+                break
+            self.pv = self.principal_variation(depth - 1)
+            try:
+                result = self.minmax(depth, True)
+            except SearchTimeout:
+                self.position = root
+                self.ply = 0
+                break
+            self.depth_reached = depth
+
+        self.deadline = None
+        self.pv = {}
+        return result
+
+    def close(self):
+        if self.parallel is not None:
+            self.parallel.shutdown()
+
+    def start_search(self, executor, difficulty, time_limit: float = None, engine: str = None) -> SearchHandle:
+        # Run find_move() on the executor and return a handle to poll or cancel it
+        event = threading.Event()
+        return SearchHandle(event, executor.submit(self.find_move, difficulty, time_limit, event, engine))
+
+    def start_ponder(self, executor, difficulty, engine: str = None) -> SearchHandle:
+        # Run ponder() on the executor from the position as it is now. Cancel the handle before the next search.
+        event = threading.Event()
+        return SearchHandle(event, executor.submit(self.ponder, self.board.position.copy(), difficulty, event,
+                                                   engine))
+
+    @staticmethod
+    def engine_for(difficulty, engine: str = None) -> str:
+        # Without an explicit engine, difficulty 5 is the "Guest" GA like it always was and anything else alpha-beta
+        if engine is None:
+            return GENETIC if difficulty == 5 else MINMAX
+        if engine not in (MINMAX, GENETIC, MONTE_CARLO):
+            raise ValueError(f"Unknown engine {engine!r}")
+        return engine
+
+    def ponder(self, root, difficulty, cancelled: threading.Event, engine: str = None):
+        # Search on P1's time, from root with P1 to move, until cancelled. For alpha-beta every P1 reply is searched
+        # at depth 1, 2, ... up to difficulty, likeliest replies first, and the finished ones go into self.pondered
+        # (the transposition table keeps the rest). MCTS grows its tree from root, which the next search re-roots.
+        self.cancelled = cancelled
+        self.pondered = {}
+        engine = self.engine_for(difficulty, engine)
+        if engine == MONTE_CARLO:
+            self.monte_carlo.search(root, iterations=self.monte_carlo.iterations * PONDER_TREE_FACTOR,
+                                    cancelled=cancelled)
+            return
+        if engine == GENETIC:
+            return
+
+        self.cache.new_search()
+        found = self.table_lookup(root, 0)
+        replies = self.order_moves(root, found[2] if found is not None else NO_MOVE)
+        try:
+            for depth in range(1, difficulty + 1):
+                for reply in replies:
+                    self.position = root.copy()
+                    self.ply = 0
+                    if not self.position.play(reply) or self.position.is_over():
+                        continue
+                    key = self.position.key
+                    self.pondered[key] = (depth,) + self.minmax(depth, True)
+        except SearchCancelled:
+            pass
+
+    def find_move(self, difficulty, time_limit: float = None, cancelled: threading.Event = None, engine: str = None):
+        # With a time_limit (seconds) difficulty only caps the depth and the search deepens until time runs out. MCTS
+        # runs for its iterations or until time_limit, the GA ignores both.
+        engine = self.engine_for(difficulty, engine)
+        self.position = self.board.position.copy()
+        self.cancelled = cancelled or threading.Event()
+        if self.stats is not None:
+            self.stats.reset()
+            started = time.perf_counter()
+
+        if engine == GENETIC:
+            score, move = self.genetic_search.search(self.position)
+        elif engine == MONTE_CARLO:
+            score, move = self.monte_carlo.search(self.position, time_limit=time_limit, cancelled=self.cancelled,
+                                                  top_up=True)
+            if self.cancelled.is_set():
+                raise SearchCancelled
+        else:
+            score, move = self.alpha_beta(difficulty, time_limit)
+
+        if self.stats is not None:
+            self.stats.elapsed = time.perf_counter() - started
+            self.stats.result = score, move
+            self.stats.trace and self.stats.trace(RESULT, difficulty, self.board.position, (score, move))
+        return score, decode_move(move) if move is not None else None
+
+    def alpha_beta(self, difficulty, time_limit: float = None):
+        # find_move() for MINMAX, from a pondered reply when there is one deep enough
+        self.ply = 0
+        self.cache.new_search()
+        pondered = self.pondered.pop(self.position.key, None)
+        self.pondered = {}
+        if time_limit is None and pondered is not None and pondered[0] >= difficulty:
+            self.ponder_hits += 1
+            return pondered[1:]
+        if time_limit is None and self.parallel is not None:
+            result = self.parallel.search(self, difficulty, self.cancelled)
+            self.cnt += self.parallel.nodes
+            return result
+        if time_limit is None:
+            return self.minmax(difficulty, True)
+        return self.iterative_deepening(difficulty, time_limit)
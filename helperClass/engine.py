@@ -0,0 +1,326 @@
+from random import Random
+
+from helperClass.constants import ROWS, COLS
+
+# Headless rules engine. The 5x5 playing area inside the 7x7 Board.board grid is indexed row-major as squares
+# 0..24, so board coordinates (row, col) map to square (row - 1) * SIZE + (col - 1). Each side's pieces are a
+# bitmask over those squares and the hole is a single square index.
+
+SIZE = ROWS - 2
+SQUARES = SIZE * (COLS - 2)
+
+P1, P2, HOLE = 0, 1, 2
+NO_MOVE = -1
+
+# Same order as the neighbor tuple the search has always used: up, down, left, right
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+OPPOSITE = (1, 0, 3, 2)
+OFFSETS = (-SIZE, SIZE, -1, 1)
+
+# Zobrist keys for every component of the position. The generator is seeded so keys, and anything stored under
+# them, are stable between runs.
+_rng = Random(0x6B6E6F636B)
+ZOBRIST_PIECE = tuple(tuple(_rng.getrandbits(64) for _ in range(SQUARES)) for _ in (P1, P2))
+ZOBRIST_HOLE = tuple(_rng.getrandbits(64) for _ in range(SQUARES))
+ZOBRIST_TURN = _rng.getrandbits(64)
+ZOBRIST_LAST = tuple(_rng.getrandbits(64) for _ in range(SQUARES * 4))
+ZOBRIST_SCORE = tuple(tuple(_rng.getrandbits(64) for _ in range(SIZE + 1)) for _ in (P1, P2))
+
+
+# Bit layout of Position.snapshot(): both masks, then the hole, turn, scores and last + 1
+_SNAPSHOT_P2 = SQUARES
+_SNAPSHOT_HOLE = 2 * SQUARES
+_SNAPSHOT_TURN = _SNAPSHOT_HOLE + 5
+_SNAPSHOT_P1_SCORE = _SNAPSHOT_TURN + 1
+_SNAPSHOT_P2_SCORE = _SNAPSHOT_P1_SCORE + 3
+_SNAPSHOT_LAST = _SNAPSHOT_P2_SCORE + 3
+_SQUARES_MASK = (1 << SQUARES) - 1
+
+
+def square(row: int, col: int) -> int:
+    return (row - 1) * SIZE + (col - 1)
+
+
+def coords(sq: int) -> (int, int):
+    return sq // SIZE + 1, sq % SIZE + 1
+
+
+def iter_squares(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _ray(sq: int, direction: int) -> tuple:
+    row, col = divmod(sq, SIZE)
+    d_row, d_col = DIRECTIONS[direction]
+    ray = []
+    row, col = row + d_row, col + d_col
+    while 0 <= row < SIZE and 0 <= col < SIZE:
+        ray.append(row * SIZE + col)
+        row, col = row + d_row, col + d_col
+    return tuple(ray)
+
+
+# RAYS[sq][direction] lists the squares a push from sq travels through, nearest first, up to the edge of the board
+RAYS = tuple(tuple(_ray(sq, direction) for direction in range(4)) for sq in range(SQUARES))
+NEIGHBORS = tuple(tuple(ray[0] if ray else -1 for ray in rays) for rays in RAYS)
+ADJACENT = tuple(sum(1 << sq for sq in neighbors if sq >= 0) for neighbors in NEIGHBORS)
+
+# Central squares are worth 2, 1 less for each side on edge of board (making corner squares 0)
+CENTRALITY = tuple(2 - (sq // SIZE in (0, SIZE - 1)) - (sq % SIZE in (0, SIZE - 1)) for sq in range(SQUARES))
+
+
+def step(sq: int, direction: int) -> int:
+    # Neighboring square in the given direction, or -1 when that falls off the board
+    return NEIGHBORS[sq][direction]
+
+
+# A move is the square of the piece (or hole) being pushed and the direction it is pushed in
+def encode_move(current_row: int, current_col: int, target_row: int, target_col: int):
+    delta = (target_row - current_row, target_col - current_col)
+    if delta not in DIRECTIONS:
+        return None
+    return square(current_row, current_col) * 4 + DIRECTIONS.index(delta)
+
+
+def decode_move(move: int) -> (int, int, int, int):
+    row, col = coords(move >> 2)
+    d_row, d_col = DIRECTIONS[move & 3]
+    return row, col, row + d_row, col + d_col
+
+
+def batch_scoring(batch: bool) -> tuple:
+    # (evaluate_states, state_of) from helperClass.batch for searches that score leaves in batches, else
+    # (None, None). numpy is only imported once a search asks for it.
+    if not batch:
+        return None, None
+    from helperClass.batch import evaluate_states, state_of
+    return evaluate_states, state_of
+
+
+class Position:
+    __slots__ = ("p1", "p2", "hole", "turn", "p1_score", "p2_score", "last", "key", "placement")
+
+    def __init__(self, p1: int, p2: int, hole: int, turn: int, p1_score: int = 0, p2_score: int = 0,
+                 last: int = NO_MOVE, key: int = None, placement: int = None):
+        self.p1 = p1
+        self.p2 = p2
+        self.hole = hole
+        self.turn = turn
+
+        # p1_score counts P2 pieces knocked out, p2_score counts P1 pieces knocked out
+        self.p1_score = p1_score
+        self.p2_score = p2_score
+
+        # The move that would exactly reverse the previous push, which is not allowed
+        self.last = last
+
+        # Zobrist hash of everything above, kept up to date by make_move()
+        self.key = self.compute_key() if key is None else key
+
+        # Centrality of P2's pieces minus P1's, also kept up to date by make_move()
+        self.placement = self.compute_placement() if placement is None else placement
+
+    @classmethod
+    def initial(cls, turn: int):
+        p1 = p2 = 0
+        for col in range(SIZE):
+            p1 |= 1 << ((SIZE - 1) * SIZE + col)
+            p2 |= 1 << col
+        return cls(p1, p2, square(3, 3), turn)
+
+    def copy(self):
+        return Position(self.p1, self.p2, self.hole, self.turn, self.p1_score, self.p2_score, self.last, self.key,
+                        self.placement)
+
+    def snapshot(self) -> int:
+        # Immutable, hashable copy of the position packed into one int (36 bytes), for holding many positions at once
+        return (self.p1 | self.p2 << _SNAPSHOT_P2 | self.hole << _SNAPSHOT_HOLE | self.turn << _SNAPSHOT_TURN |
+                self.p1_score << _SNAPSHOT_P1_SCORE | self.p2_score << _SNAPSHOT_P2_SCORE |
+                (self.last + 1) << _SNAPSHOT_LAST)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: int):
+        return cls(snapshot & _SQUARES_MASK, snapshot >> _SNAPSHOT_P2 & _SQUARES_MASK, snapshot >> _SNAPSHOT_HOLE & 31,
+                   snapshot >> _SNAPSHOT_TURN & 1, snapshot >> _SNAPSHOT_P1_SCORE & 7,
+                   snapshot >> _SNAPSHOT_P2_SCORE & 7, (snapshot >> _SNAPSHOT_LAST) - 1)
+
+    def compute_placement(self) -> int:
+        return sum(CENTRALITY[sq] for sq in iter_squares(self.p2)) - sum(CENTRALITY[sq] for sq in iter_squares(self.p1))
+
+    def compute_key(self) -> int:
+        key = ZOBRIST_HOLE[self.hole] ^ ZOBRIST_SCORE[P1][self.p1_score] ^ ZOBRIST_SCORE[P2][self.p2_score]
+        for sq in iter_squares(self.p1):
+            key ^= ZOBRIST_PIECE[P1][sq]
+        for sq in iter_squares(self.p2):
+            key ^= ZOBRIST_PIECE[P2][sq]
+        if self.turn == P2:
+            key ^= ZOBRIST_TURN
+        if self.last != NO_MOVE:
+            key ^= ZOBRIST_LAST[self.last]
+        return key
+
+    def __str__(self):
+        return "\n".join("".join(".12X"[self.piece_at(row * SIZE + col) + 1] for col in range(SIZE))
+                         for row in range(SIZE))
+
+    def piece_at(self, sq: int) -> int:
+        if sq == self.hole:
+            return HOLE
+        if self.p1 >> sq & 1:
+            return P1
+        if self.p2 >> sq & 1:
+            return P2
+        return -1
+
+    def get_winner(self):
+        if self.p1_score == 2:
+            return P1
+        if self.p2_score == 2:
+            return P2
+        return None
+
+    def is_over(self) -> bool:
+        return self.p1_score == 2 or self.p2_score == 2
+
+    def chain(self, move: int):
+        # return: (squares of the pushed pieces, empty square reached) where the square is -1 if the last pushed
+        # piece is knocked off the board or into the hole, or None if the move is illegal
+        start, direction = move >> 2, move & 3
+        occupied = self.p1 | self.p2
+
+        # The Hole cannot be pushed off of the board or onto another piece
+        if start == self.hole:
+            target = NEIGHBORS[start][direction]
+            if target < 0 or occupied >> target & 1 or move == self.last:
+                return None
+            return [start], target
+
+        own = self.p2 if self.turn == P2 else self.p1
+        if not own >> start & 1:
+            return None
+
+        pushed = [start]
+        for target in RAYS[start][direction]:
+            # Knocking a piece out changes the position for good, so it can never reverse the last move
+            if target == self.hole:
+                return pushed, -1
+            if not occupied >> target & 1:
+                # Pushing onto an empty square is valid unless it simply reverses the last move made
+                if move == self.last:
+                    return None
+                return pushed, target
+            pushed.append(target)
+        return pushed, -1
+
+    def generate_moves(self, suicides: bool = True):
+        # Yield (move, pushed squares, empty square reached or -1) for every legal move, as chain() would report
+        # them. With suicides=False, pushing the selected piece straight off the board or into the hole is skipped.
+        occupied = self.p1 | self.p2
+        hole = self.hole
+        last = self.last
+
+        for sq in iter_squares(self.p2 if self.turn == P2 else self.p1):
+            for direction, ray in enumerate(RAYS[sq]):
+                pushed = [sq]
+                target = -1
+                for nxt in ray:
+                    if nxt == hole:
+                        break
+                    if not occupied >> nxt & 1:
+                        target = nxt
+                        break
+                    pushed.append(nxt)
+
+                move = sq * 4 + direction
+                if target >= 0:
+                    if move != last:
+                        yield move, pushed, target
+                elif suicides or len(pushed) > 1:
+                    yield move, pushed, -1
+
+        for direction, target in enumerate(NEIGHBORS[hole]):
+            move = hole * 4 + direction
+            if target >= 0 and not occupied >> target & 1 and move != last:
+                yield move, [hole], target
+
+    def legal_moves(self, suicides: bool = True) -> list:
+        return [move for move, _, _ in self.generate_moves(suicides)]
+
+    def play(self, move: int) -> bool:
+        return self.make_move(move) is not None
+
+    def make_move(self, move: int):
+        # Validate and apply move in one pass.
+        # return: undo record for unmake_move(), or None if the move is illegal (position untouched)
+
+        found = self.chain(move)
+        if found is None:
+            return None
+
+        # A push only ever changes the two masks, the hole and the scalars, so the previous values of those are
+        # the whole undo record
+        undo = (self.p1, self.p2, self.hole, self.p1_score, self.p2_score, self.last, self.key, self.placement)
+
+        pushed, target = found
+        direction = move & 3
+        key = self.key
+
+        if pushed[0] == self.hole:
+            key ^= ZOBRIST_HOLE[self.hole] ^ ZOBRIST_HOLE[target]
+            self.hole = target
+        else:
+            if target < 0:
+                # The piece at the front of the push is knocked out
+                sq = pushed.pop()
+                if self.p1 >> sq & 1:
+                    self.p1 ^= 1 << sq
+                    self.placement += CENTRALITY[sq]
+                    key ^= ZOBRIST_PIECE[P1][sq]
+                    key ^= ZOBRIST_SCORE[P2][self.p2_score] ^ ZOBRIST_SCORE[P2][self.p2_score + 1]
+                    self.p2_score += 1
+                else:
+                    self.p2 ^= 1 << sq
+                    self.placement -= CENTRALITY[sq]
+                    key ^= ZOBRIST_PIECE[P2][sq]
+                    key ^= ZOBRIST_SCORE[P1][self.p1_score] ^ ZOBRIST_SCORE[P1][self.p1_score + 1]
+                    self.p1_score += 1
+
+            offset = OFFSETS[direction]
+            segment = 0
+            placement = self.placement
+            for sq in pushed:
+                segment |= 1 << sq
+                if self.p1 >> sq & 1:
+                    key ^= ZOBRIST_PIECE[P1][sq] ^ ZOBRIST_PIECE[P1][sq + offset]
+                    placement -= CENTRALITY[sq + offset] - CENTRALITY[sq]
+                else:
+                    key ^= ZOBRIST_PIECE[P2][sq] ^ ZOBRIST_PIECE[P2][sq + offset]
+                    placement += CENTRALITY[sq + offset] - CENTRALITY[sq]
+            self.placement = placement
+
+            moved_p1, moved_p2 = self.p1 & segment, self.p2 & segment
+            if offset > 0:
+                self.p1 = self.p1 ^ moved_p1 | moved_p1 << offset
+                self.p2 = self.p2 ^ moved_p2 | moved_p2 << offset
+            else:
+                self.p1 = self.p1 ^ moved_p1 | moved_p1 >> -offset
+                self.p2 = self.p2 ^ moved_p2 | moved_p2 >> -offset
+
+        # Dropping a piece means the next move cannot be a reverse of the current one
+        last = NO_MOVE if target < 0 else target * 4 + OPPOSITE[direction]
+        if self.last != NO_MOVE:
+            key ^= ZOBRIST_LAST[self.last]
+        if last != NO_MOVE:
+            key ^= ZOBRIST_LAST[last]
+
+        self.last = last
+        self.turn = P2 if self.turn == P1 else P1
+        self.key = key ^ ZOBRIST_TURN
+        return undo
+
+    def unmake_move(self, undo):
+        self.p1, self.p2, self.hole, self.p1_score, self.p2_score, self.last, self.key, self.placement = undo
+        self.turn = P2 if self.turn == P1 else P1
@@ -1,3 +1,5 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from ctypes import Union
 
 import pygame
@@ -5,10 +7,20 @@ import pygame_menu
 from helperClass.constants import WIDTH, HEIGHT, SQUARE_SIZE, P1_COLOR, P2_COLOR
 from helperClass.playground import Board
 from random import randint
-from helperClass.cpu import Automa
-from helperClass.messages import showMessage
+from helperClass.cache import SearchCache
+from helperClass.cpu import Automa, MINMAX, GENETIC, MONTE_CARLO
+from helperClass.messages import showMessage, prewarm
 from pygame_menu import sound
 
+# How long the CPU's chosen piece is highlighted before it moves
+HIGHLIGHT_MS = 1000
+
+# With nothing to animate the loop sleeps in pygame.event.wait() and wakes at least this often
+IDLE_FPS = 4
+
+# Posted from the search thread when a CPU move is ready, so the idle loop wakes for it
+SEARCH_DONE = pygame.event.custom_type()
+
 
 class Game:
 
@@ -17,7 +29,20 @@ class Game:
         self.WIN = pygame.display.set_mode((WIDTH, HEIGHT))
         self.FPS = 60
         pygame.display.set_caption("KnockOut!")
+        prewarm()
         self.difficulty = 2
+        self.engine = MINMAX
+
+        # CPU moves are searched on a single background thread so the window keeps responding
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.search = None
+        self.highlight = None
+
+        # Search results worth keeping from one game to the next, shared by every game's Automa
+        self.cache = SearchCache()
+
+        # While P1 thinks the engine ponders on the same thread, and stops before the CPU's own search starts
+        self.ponder = None
 
     def getMode(self):
         return self.mode
@@ -31,19 +56,71 @@ class Game:
     def set_start_new_game(self, newgame):
         self.start_new_game = newgame
 
+    def stop_ponder(self):
+        if self.ponder is not None:
+            self.ponder.cancel()
+        self.ponder = None
+
+    def cancel_search(self):
+        self.stop_ponder()
+        if self.search is not None:
+            self.search.cancel()
+        self.search = None
+        self.highlight = None
+
+    def quit(self):
+        # The cancelled search returns at its next node check, wait for it so nothing posts to a closed pygame
+        self.cancel_search()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        pygame.quit()
+        sys.exit()
+
+    def wait_events(self, timeout: int) -> list:
+        # Block until an event arrives or timeout ms pass
+        # return: every pending event, empty on timeout
+        event = pygame.event.wait(timeout) if timeout > 0 else pygame.event.poll()
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
+
+    def next_timeout(self, board) -> int:
+        # ms the loop may sleep before the game has something to do without being sent an event
+        if self.mode in ("announce_first", "winner") or board.get_winner():
+            return 0
+        if self.mode == "play":
+            if board.get_turn_player() == P1_COLOR and self.ponder is None:
+                return 0
+            if board.get_turn_player() == P2_COLOR:
+                if self.ponder is not None or (self.search is None and self.highlight is None):
+                    return 0
+                if self.highlight is not None:
+                    return max(0, self.highlight[1] - pygame.time.get_ticks())
+        return 1000 // IDLE_FPS
+
+    def wait_for_click(self):
+        # Sleep until the player clicks, for screens that show a message and nothing else
+        while True:
+            event = pygame.event.wait()
+            if event.type == pygame.QUIT:
+                self.quit()
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                return
+
     @staticmethod
     def get_row_col(pos: (int, int)) -> (int, int):
 
         return pos[1] // SQUARE_SIZE, pos[0] // SQUARE_SIZE
 
-    def set_difficulty(self, difficulty_str: str, difficulty_num: int) -> None:
+    def set_difficulty(self, difficulty_str: str, difficulty_num: int, engine: str = MINMAX) -> None:
         self.difficulty = difficulty_num
-        print(f"Difficulty {self.difficulty}")
+        self.engine = engine
+        print(f"Difficulty {self.difficulty} ({self.engine})")
 
     def run_game(self):
 
         while True:
-            # We have to re-run game setup when we start a new game
+            # We have to re-run game setup when we start a new game, abandoning any search from the last one
+            self.cancel_search()
             self.mode = "main_menu"
             self.start_new_game = False
 
@@ -53,13 +130,15 @@ class Game:
             run = True
             clock = pygame.time.Clock()
             board = Board(first_player)
-            automa = Automa(board)
+            automa = Automa(board, cache=self.cache)
 
             main_menu = pygame_menu.Menu('KnockOut', WIDTH / 2, HEIGHT / 2, theme=pygame_menu.themes.THEME_SOLARIZED)
             main_menu.add.button('Play', self.setMode, "announce_first")
-            main_menu.add.selector('Difficulty: ', [("Easy", 2), ("Medium", 3), ("Hard", 4), ("Guest", 5)],
+            main_menu.add.selector('Difficulty: ',
+                                   [("Easy", 2, MINMAX), ("Medium", 3, MINMAX), ("Hard", 4, MINMAX),
+                                    ("Guest", 5, GENETIC), ("Monte Carlo", 0, MONTE_CARLO)],
                                    onchange=self.set_difficulty)
-            main_menu.add.button('Quit', pygame_menu.events.EXIT)
+            main_menu.add.button('Quit', self.quit)
 
             engine = sound.Sound()
             engine.set_sound(sound.SOUND_TYPE_CLICK_MOUSE, 'assets/click.ogx')
@@ -68,29 +147,45 @@ class Game:
             self.setMode(main_menu)
 
             while run and not self.start_new_game:
+                # FPS caps the frame rate while events stream in, otherwise the loop sleeps until it's needed
                 clock.tick(self.FPS)
+                events = self.wait_events(self.next_timeout(board))
 
                 if board.get_winner():
                     self.mode = "winner"
 
+                if board.get_turn_player() == P1_COLOR and self.mode == "play":
+                    if self.ponder is None:
+                        self.ponder = automa.start_ponder(self.executor, self.difficulty, self.engine)
+                else:
+                    self.stop_ponder()
+
                 if board.get_turn_player() == P2_COLOR and self.mode == "play":
 
-                    _, move = automa.find_move(self.difficulty)
-                    print("a move")
-                    print(move)
-                    moving_piece = board.get_piece((move[0], move[1]))
-                    print("moving: ",moving_piece.row,moving_piece.col)
-                    moving_piece.toggle_selected()
-                    moving_piece.draw(self.WIN)
-                    pygame.display.update()
-                    pygame.time.wait(1000)
-                    moving_piece.toggle_selected()
-                    moving_piece.draw(self.WIN)
-                    pygame.display.update()
-                    board.take_turn(*move, False)
+                    # The search runs on the worker thread while we keep drawing frames. Once it answers, the piece
+                    # to move stays highlighted for HIGHLIGHT_MS before the move is made.
+                    if self.search is None and self.highlight is None:
+                        self.search = automa.start_search(self.executor, self.difficulty, engine=self.engine)
+                        self.search.future.add_done_callback(
+                            lambda _: pygame.get_init() and pygame.event.post(pygame.event.Event(SEARCH_DONE)))
+                    elif self.search is not None and self.search.done():
+                        _, move = self.search.result()
+                        self.search = None
+                        print("a move")
+                        print(move)
+                        moving_piece = board.get_piece((move[0], move[1]))
+                        print("moving: ", moving_piece.row, moving_piece.col)
+                        board.toggle_selected((move[0], move[1]))
+                        self.highlight = move, pygame.time.get_ticks() + HIGHLIGHT_MS
+                    elif self.highlight is not None and pygame.time.get_ticks() >= self.highlight[1]:
+                        move = self.highlight[0]
+                        self.highlight = None
+                        board.toggle_selected((move[0], move[1]))
+                        board.take_turn(*move, False)
 
-                events = pygame.event.get()
                 for event in events:
+                    if event.type == pygame.QUIT:
+                        self.quit()
                     if event.type == pygame.MOUSEBUTTONDOWN and self.mode == "play" and board.get_turn_player() == P1_COLOR:
                         position = self.get_row_col(pygame.mouse.get_pos())
 
@@ -103,36 +198,33 @@ class Game:
                             board.take_turn(board.selected_piece[0], board.selected_piece[1], position[0], position[1])
 
                 if self.mode == "announce_first":
-                    board.draw_grid(self.WIN)
-                    board.draw_pieces(self.WIN)
-                    pygame.display.update()
+                    board.invalidate()
+                    board.draw(self.WIN)
                     message = "You go first" if board.get_turn_player() == P1_COLOR else "CPU goes first"
                     showMessage(message, self.WIN)
-                    while self.mode == "announce_first":
-                        events = pygame.event.get()
-                        for event in events:
-                            if event.type == pygame.MOUSEBUTTONDOWN:
-                                self.mode = "play"
+                    self.wait_for_click()
+                    self.mode = "play"
+                    board.invalidate()
 
                 if self.mode == "winner":
                     winner_message = ("You" if board.get_winner() == P1_COLOR else "CPU") + " Won!"
                     showMessage(winner_message, self.WIN)
-                    while self.mode == "winner":
-                        events = pygame.event.get()
-                        for event in events:
-                            if event.type == pygame.MOUSEBUTTONDOWN:
-                                pygame.event.wait(pygame.MOUSEBUTTONUP)
-                                pygame.time.wait(250)
-                                pygame.event.clear()
-                                self.start_new_game = True
-                                self.mode = None
-
-                board.draw_grid(self.WIN)
-                board.draw_pieces(self.WIN)
-                board.draw_score(self.WIN)
-
+                    self.wait_for_click()
+                    pygame.event.wait(pygame.MOUSEBUTTONUP)
+                    pygame.time.wait(250)
+                    pygame.event.clear()
+                    self.start_new_game = True
+                    self.mode = None
+
+                # The menu repaints itself every frame, so under it the whole window is redrawn. In play only the
+                # squares a move or selection touched are.
                 if self.mode == main_menu:
+                    board.invalidate()
+                    board.draw(self.WIN)
                     self.mode.draw(self.WIN)
                     self.mode.update(events)
-
-                pygame.display.update()
+                    pygame.display.update()
+                else:
+                    rects = board.draw(self.WIN)
+                    if rects:
+                        pygame.display.update(rects)
@@ -0,0 +1,143 @@
+import random
+
+from helperClass.engine import P1, NO_MOVE, batch_scoring
+from helperClass.selection import SELECTIONS
+
+# The "Guest" engine. Genes are move ints and chromosomes are (human move, cpu move) tuples, so a generation is a
+# few lists of small ints. Positions are never copied: every fitness is taken by replaying a chromosome on one
+# working Position with make_move/unmake_move.
+#
+# Each generation follows the original design: CPU moves and human moves are scored on their own (CPU high, human
+# low), half of each pool is picked as parents, and every pairing of a picked human move followed by a picked
+# CPU move is an offspring. The best offspring so far is the answer. The next pools are the CPU and human genes of
+# the best offspring plus elites, topped up with fresh legal moves, and mutation swaps genes for random legal moves.
+
+
+class GeneticSearch:
+
+    def __init__(self, evaluate, population_size: int = 24, generations: int = 3, mutation_rate: float = 0.1,
+                 elitism: int = 2, selection: str = "tournament", seed: int = None, batch: bool = False):
+        self.evaluate = evaluate
+        self.population_size = population_size
+        self.generations = generations
+        self.mutation_rate = mutation_rate
+        self.elitism = elitism
+
+        # One of selection.SELECTIONS. A seed makes every search reproducible.
+        self.select = SELECTIONS[selection]
+        self.rng = random.Random(seed)
+
+        # Score each pool with one numpy call (helperClass.batch) instead of per chromosome. Only worth it for
+        # populations in the hundreds.
+        self.evaluate_states, self.state_of = batch_scoring(batch)
+
+    def human_moves(self, position) -> list:
+        # Human moves are considered as if the human moved now, in the CPU's place
+        turn = position.turn
+        position.turn = P1
+        moves = position.legal_moves(suicides=False)
+        position.turn = turn
+        return moves
+
+    def fitness(self, position, chromosome: tuple, evaluate=None):
+        # return: evaluate(position) after playing the chromosome's moves, or None if they can't be played in that
+        # order
+        evaluate = evaluate or self.evaluate
+        human, cpu = chromosome
+        undo_human = undo_cpu = None
+
+        if human != NO_MOVE:
+            turn = position.turn
+            position.turn = P1
+            undo_human = position.make_move(human)
+            if undo_human is None:
+                position.turn = turn
+                return None
+        if cpu != NO_MOVE:
+            undo_cpu = position.make_move(cpu)
+
+        score = evaluate(position) if cpu == NO_MOVE or undo_cpu is not None else None
+
+        if undo_cpu is not None:
+            position.unmake_move(undo_cpu)
+        if undo_human is not None:
+            position.unmake_move(undo_human)
+            position.turn = turn
+        return score
+
+    def score_all(self, position, chromosomes: list) -> list:
+        if self.evaluate_states is None:
+            return [self.fitness(position, chromosome) for chromosome in chromosomes]
+
+        states = [self.fitness(position, chromosome, self.state_of) for chromosome in chromosomes]
+        scores = iter(self.evaluate_states([state for state in states if state is not None]))
+        return [None if state is None else next(scores) for state in states]
+
+    def selection(self, genes: list, scores: list, maximize: bool) -> list:
+        # Half the pool goes through as parents
+        return [genes[i] for i in self.select(scores, len(genes) // 2, self.rng, maximize)]
+
+    def mutate(self, genes: list, legal: list) -> list:
+        # Swap genes for random legal moves not already in the pool, so the pool never holds duplicates
+        genes = genes[:]
+        for i in range(len(genes)):
+            if self.rng.random() < self.mutation_rate:
+                unused = [move for move in legal if move not in genes]
+                if unused:
+                    genes[i] = self.rng.choice(unused)
+        return genes
+
+    def next_pool(self, genes: list, scores: list, offspring_genes: list, legal: list, maximize: bool) -> list:
+        # Elites of the scored pool, then the genes of the best offspring, then fresh legal moves to keep the pool
+        # at population_size, without repeats
+        ranked = sorted(range(len(genes)), key=scores.__getitem__, reverse=maximize)
+        pool = [genes[i] for i in ranked[:self.elitism]]
+        for gene in offspring_genes:
+            if gene not in pool:
+                pool.append(gene)
+
+        size = min(self.population_size, len(legal))
+        del pool[size:]
+        if len(pool) < size:
+            pool += self.rng.sample([move for move in legal if move not in pool], size - len(pool))
+        return pool
+
+    def search(self, position):
+        # Evolve CPU moves for position, P2 to move.
+        # return: (fitness, best move) where the move is None if nothing could be played
+        cpu_legal = position.legal_moves(suicides=False)
+        human_legal = self.human_moves(position)
+        cpu = self.rng.sample(cpu_legal, min(len(cpu_legal), self.population_size))
+        human = self.rng.sample(human_legal, min(len(human_legal), self.population_size))
+
+        best_score, best_move = float("-inf"), None
+        for generation in range(self.generations):
+            cpu_scores = self.score_all(position, [(NO_MOVE, gene) for gene in cpu])
+            human_scores = self.score_all(position, [(gene, NO_MOVE) for gene in human])
+
+            human_parents = self.selection(human, human_scores, False)
+            cpu_parents = self.selection(cpu, cpu_scores, True)
+
+            pairs = [(human_gene, cpu_gene) for human_gene in human_parents for cpu_gene in cpu_parents]
+            offspring = [(score, human_gene, cpu_gene)
+                         for score, (human_gene, cpu_gene) in zip(self.score_all(position, pairs), pairs)
+                         if score is not None]
+
+            if not offspring:
+                break
+            offspring.sort(reverse=True)
+            if offspring[0][0] > best_score:
+                best_score, best_move = offspring[0][0], offspring[0][2]
+
+            if generation + 1 < self.generations:
+                cpu = self.next_pool(cpu, cpu_scores, [child[2] for child in offspring], cpu_legal, True)
+                human = self.next_pool(human, human_scores, [child[1] for child in reversed(offspring)],
+                                       human_legal, False)
+                cpu = self.mutate(cpu, cpu_legal)
+                human = self.mutate(human, human_legal)
+
+        # Nothing paired up, fall back to the best CPU move on its own
+        if best_move is None and cpu:
+            best_score, best_move = max((self.fitness(position, (NO_MOVE, gene)), gene) for gene in cpu)
+
+        return best_score, best_move
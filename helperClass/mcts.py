@@ -0,0 +1,185 @@
+import math
+import random
+import time
+
+from helperClass.engine import P2, batch_scoring
+
+# Monte Carlo tree search (UCT). Results are P2 (CPU) win chances in [0, 1]: a knock-out win is 1 or 0, and a
+# rollout that runs out of plies is scored by squashing the static evaluation. The tree survives between
+# searches and is re-rooted on the position actually reached, so the moves that were played keep their statistics.
+
+
+class Node:
+
+    def __init__(self, move: int, parent, position):
+        self.move = move
+        self.parent = parent
+        self.key = position.key
+        self.turn = position.turn
+        self.untried = [] if position.is_over() else position.legal_moves(suicides=False)
+        self.children = []
+        self.visits = 0
+        self.value = 0.0
+
+    def size(self) -> int:
+        return 1 + sum(child.size() for child in self.children)
+
+
+class MonteCarloSearch:
+
+    def __init__(self, evaluate, iterations: int = 3000, rollout_depth: int = 12, batch_size: int = 1,
+                 exploration: float = 1.4, seed: int = None, batch: bool = False):
+        self.evaluate = evaluate
+        self.iterations = iterations
+        self.rollout_depth = rollout_depth
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.root = None
+
+        # Rollouts per selected leaf. More of them amortise selection and expansion over more playouts.
+        self.batch_size = batch_size
+
+        # Score each leaf's batch of rollout end positions with one numpy call (helperClass.batch)
+        self.evaluate_states, self.state_of = batch_scoring(batch)
+
+        # Filled in by search(), total_playouts keeps counting across searches
+        self.playouts = 0
+        self.total_playouts = 0
+        self.elapsed = 0.0
+
+    def squash(self, score) -> float:
+        return 1.0 / (1.0 + math.exp(-score / 10))
+
+    def reroot(self, position):
+        # Keep the subtree for position if it is at most two plies below the old root, otherwise start over
+        if self.root is not None:
+            for node in [self.root] + self.root.children:
+                for candidate in [node] + node.children:
+                    if candidate.key == position.key:
+                        candidate.parent = None
+                        self.root = candidate
+                        return
+        self.root = Node(None, None, position)
+
+    def select(self, node):
+        log_visits = math.log(node.visits)
+        best, best_score = None, float("-inf")
+        for child in node.children:
+            mean = child.value / child.visits
+            if node.turn != P2:
+                mean = 1.0 - mean
+            score = mean + self.exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def rollout(self, position):
+        # Random playout for at most rollout_depth plies, left unmade for the caller to score
+        undos = []
+        for _ in range(self.rollout_depth):
+            if position.is_over():
+                break
+            moves = position.legal_moves(suicides=False)
+            if not moves:
+                break
+            undos.append(position.make_move(self.rng.choice(moves)))
+        return undos
+
+    def score(self, position) -> float:
+        if position.p2_score == 2:
+            return 1.0
+        if position.p1_score == 2:
+            return 0.0
+        return self.squash(self.evaluate(position))
+
+    def playout_batch(self, position) -> float:
+        # return: summed results of batch_size rollouts from position
+        if position.is_over():
+            return self.score(position) * self.batch_size
+
+        total = 0.0
+        states = []
+        for _ in range(self.batch_size):
+            undos = self.rollout(position)
+            if self.evaluate_states is None or position.is_over():
+                total += self.score(position)
+            else:
+                states.append(self.state_of(position))
+            for undo in reversed(undos):
+                position.unmake_move(undo)
+
+        if states:
+            total += sum(self.squash(score) for score in self.evaluate_states(states))
+        return total
+
+    def search(self, position, iterations: int = None, time_limit: float = None, cancelled=None,
+               top_up: bool = False):
+        # Run iterations (or until time_limit seconds pass) of select, expand, playout and backup from position.
+        # With top_up, iterations the re-rooted tree already holds count towards the budget.
+        # return: (P2 win chance of the chosen move, move) where the move is the root's most visited child
+        started = time.perf_counter()
+        deadline = started + time_limit if time_limit is not None else None
+        iterations = iterations or self.iterations
+        self.reroot(position)
+        self.playouts = 0
+        if top_up:
+            iterations = max(1, iterations - self.root.visits // self.batch_size)
+
+        root = self.root
+        for iteration in range(iterations):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if cancelled is not None and cancelled.is_set():
+                break
+
+            # Walk down fully expanded nodes, then expand one untried move
+            node = root
+            undos = []
+            while not node.untried and node.children:
+                node = self.select(node)
+                undos.append(position.make_move(node.move))
+            if node.untried:
+                move = node.untried.pop(self.rng.randrange(len(node.untried)))
+                undos.append(position.make_move(move))
+                child = Node(move, node, position)
+                node.children.append(child)
+                node = child
+
+            total = self.playout_batch(position)
+            self.playouts += self.batch_size
+            for undo in reversed(undos):
+                position.unmake_move(undo)
+
+            while node is not None:
+                node.visits += self.batch_size
+                node.value += total
+                node = node.parent
+
+        self.elapsed = time.perf_counter() - started
+        self.total_playouts += self.playouts
+        if not root.children:
+            return self.score(position), None
+        best = max(root.children, key=lambda child: child.visits)
+        return best.value / best.visits, best.move
+
+
+def benchmark(seconds: float = 2.0, batch_sizes=(1, 4, 16)):
+    # Playouts per second from the opening position for a few rollout batch sizes
+    from helperClass.cpu import evaluate
+    from helperClass.engine import Position
+
+    results = []
+    for batch_size in batch_sizes:
+        search = MonteCarloSearch(evaluate, iterations=10 ** 9, batch_size=batch_size, seed=0)
+        search.search(Position.initial(P2), time_limit=seconds)
+        results.append({"batch_size": batch_size, "playouts": search.playouts, "tree_nodes": search.root.size(),
+                        "playouts_per_sec": round(search.playouts / search.elapsed)})
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    for result in benchmark(*map(float, sys.argv[1:2])):
+        print(json.dumps(result))
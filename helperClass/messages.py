@@ -1,29 +1,64 @@
+from functools import lru_cache
+
 import pygame
-from helperClass.constants import BLUE, WHITE, WIDTH, HEIGHT
+from helperClass.constants import WHITE, WIDTH, HEIGHT
 
 TEXT_FONT_SIZE = 64
 SUBTEXT_FONT_SIZE = 32
 TEXT_COLOR = (0, 102, 102)
 BG_FILL = WHITE
 BORDER_PX = 8
+SUBTEXT = "--Click to Continue--"
+
+# Rendered text and message boxes kept, least recently used dropped first
+MESSAGE_CACHE_SIZE = 32
+
+# Every message the game shows, rendered by prewarm() before the first one is needed
+GAME_MESSAGES = ("You go first", "CPU goes first", "You Won!", "CPU Won!")
+
+# Loaded fonts by size
+_fonts = {}
+
+
+def get_font(size: int) -> pygame.font.Font:
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
 
 
-def showMessage(message: str, win: pygame.Surface, subtext="--Click to Continue--") -> None:
+@lru_cache(maxsize=MESSAGE_CACHE_SIZE)
+def render_text(text: str, size: int, color) -> pygame.Surface:
+    return get_font(size).render(text, True, color)
 
-    font = pygame.font.Font(None, TEXT_FONT_SIZE)
-    subtitle_font = pygame.font.Font(None, SUBTEXT_FONT_SIZE)
-    text = font.render(message, True, TEXT_COLOR)
-    subtext = subtitle_font.render(subtext, True, TEXT_COLOR)
+
+@lru_cache(maxsize=MESSAGE_CACHE_SIZE)
+def message_surface(message: str, subtext: str) -> pygame.Surface:
+    # The message over its subtext on the background fill, border included
+    text = render_text(message, TEXT_FONT_SIZE, TEXT_COLOR)
+    subtext = render_text(subtext, SUBTEXT_FONT_SIZE, TEXT_COLOR)
     textRect = text.get_rect()
     subtextRect = subtext.get_rect()
     subtextRect.midtop = textRect.midbottom
     allTextRect = pygame.Rect.union(textRect, subtextRect)
-    allTextSurf = pygame.Surface((allTextRect.width, allTextRect.height))
-    allTextSurf.fill(BG_FILL)
-    allTextSurf.blit(text, textRect)
-    allTextSurf.blit(subtext, subtextRect)
-    allTextRect.center = WIDTH // 2, HEIGHT // 2
-    background_rect = allTextRect.inflate(BORDER_PX, BORDER_PX)
-    pygame.draw.rect(win, BG_FILL, background_rect)
-    win.blit(allTextSurf, allTextRect)
+    surface = pygame.Surface((allTextRect.width + BORDER_PX, allTextRect.height + BORDER_PX))
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert()
+    surface.fill(BG_FILL)
+    offset = BORDER_PX // 2 - allTextRect.x, BORDER_PX // 2 - allTextRect.y
+    surface.blit(text, textRect.move(offset))
+    surface.blit(subtext, subtextRect.move(offset))
+    return surface
+
+
+def prewarm(messages=GAME_MESSAGES, subtext=SUBTEXT) -> None:
+    # Load the fonts and render messages now, so showing them later does neither
+    for message in messages:
+        message_surface(message, subtext)
+
+
+def showMessage(message: str, win: pygame.Surface, subtext=SUBTEXT) -> None:
+
+    surface = message_surface(message, subtext)
+    win.blit(surface, surface.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
     pygame.display.update()
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+from helperClass.cpu import Automa
+from helperClass.engine import Position
+
+# Move ordering benchmark: interior nodes (Automa.cnt) a fixed-depth minmax visits from each of POSITIONS, with
+# Automa.order_moves() and with moves searched in the order the generator yields them. Every search gets a fresh
+# table, so the counts only depend on the positions, the depth and the search itself.
+
+# P2 to move, as Position(p1, p2, hole, turn, p1_score, p2_score, last). Taken from seeded random play
+# (random.Random(7), 2 to 12 plies from the initial position with P2 first), so most are past a knock-out.
+POSITIONS = [
+    (30408704, 23, 12, 1, 1, 1, -1),
+    (31457280, 30, 11, 1, 1, 1, 47),
+    (32505856, 15, 12, 1, 1, 0, 96),
+    (23330816, 278, 13, 1, 1, 1, 73),
+    (11550720, 345, 12, 1, 0, 1, 57),
+    (11042816, 23, 6, 1, 1, 1, 77),
+    (11173888, 153, 18, 1, 1, 0, 77),
+    (18022400, 405, 12, 1, 0, 1, 69),
+]
+
+
+class UnorderedAutoma(Automa):
+    # Generator order, no hash move, killers or history
+
+    def order_moves(self, position, hash_move: int) -> list:
+        return position.legal_moves(suicides=False)
+
+    def record_cutoff(self, position, move: int, depth: int):
+        pass
+
+
+def count_nodes(automa_class, fields, depth: int) -> (int, float):
+    # return: (interior nodes, root score) of one minmax from the position
+    automa = automa_class(SimpleNamespace(position=Position(*fields)))
+    score, _ = automa.minmax(depth, True)
+    return automa.cnt, score
+
+
+def benchmark(depths=(3, 4, 5, 6)) -> list:
+    results = []
+    for depth in depths:
+        unordered = [count_nodes(UnorderedAutoma, fields, depth) for fields in POSITIONS]
+        ordered = [count_nodes(Automa, fields, depth) for fields in POSITIONS]
+        before, after = sum(nodes for nodes, _ in unordered), sum(nodes for nodes, _ in ordered)
+        results.append({"depth": depth, "unordered": before, "ordered": after,
+                        "nodes_saved": round(1 - after / before, 3),
+                        "scores_match": [score for _, score in unordered] == [score for _, score in ordered]})
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    print(json.dumps(benchmark([int(depth) for depth in sys.argv[1:]] or (3, 4, 5, 6)), indent=2))
@@ -0,0 +1,179 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from types import SimpleNamespace
+
+from helperClass.engine import Position, P2, NO_MOVE, decode_move
+
+# Root-split search: the root's moves are searched in worker processes, each with its own Automa and
+# transposition table that live as long as the pool. The best score found so far is shared through a
+# multiprocessing.Array and every root move starts its search with it as alpha. The array also holds the number of
+# the current search: tasks from an earlier one leave alpha alone and give up at their next cancellation check.
+
+GENERATION, ALPHA = 0, 1
+
+_shared = None
+_worker = None
+
+
+class _Superseded:
+    # Stands in for Automa.cancelled in a worker: set once a newer search has started
+
+    def __init__(self, generation: int):
+        self.generation = generation
+
+    def is_set(self) -> bool:
+        return _shared[GENERATION] != self.generation
+
+
+def _init_worker(shared, table_bits):
+    global _shared, _worker
+    from helperClass.cpu import Automa
+
+    _shared = shared
+    _worker = Automa(SimpleNamespace(position=Position.initial(P2)), table_bits)
+
+
+def _search_root_move(position, move: int, depth: int, generation: int):
+    # return: (score, move, interior nodes searched, alpha the search started with), or None if the search the task
+    # belongs to was cancelled or superseded. A score at or below that alpha only bounds the move from above, which
+    # is all the root needs to reject it.
+    from helperClass.cpu import SearchCancelled
+
+    start_nodes = _worker.cnt
+    with _shared.get_lock():
+        if _shared[GENERATION] != generation:
+            return None
+        alpha = _shared[ALPHA]
+
+    _worker.position = position
+    _worker.ply = 1
+    _worker.cancelled = _Superseded(generation)
+    position.make_move(move)
+    try:
+        score, _ = _worker.minmax(depth - 1, False, alpha, float("inf"))
+    except SearchCancelled:
+        return None
+
+    with _shared.get_lock():
+        if _shared[GENERATION] != generation:
+            return None
+        if score > _shared[ALPHA]:
+            _shared[ALPHA] = score
+
+    return score, move, _worker.cnt - start_nodes, alpha
+
+
+class RootSplitSearch:
+
+    def __init__(self, workers: int = None, table_bits: int = 16):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.shared = multiprocessing.Array("d", [0, float("-inf")])
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                            initargs=(self.shared, table_bits))
+        self.generation = 0
+        self.nodes = 0
+
+        # Tasks of a cancelled search that were already running, see search()
+        self.in_flight = set()
+
+    def new_generation(self) -> int:
+        # Start a search: everything still running for the previous one is superseded and alpha starts over
+        self.generation += 1
+        with self.shared.get_lock():
+            self.shared[GENERATION] = self.generation
+            self.shared[ALPHA] = float("-inf")
+        return self.generation
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def search(self, automa, depth: int, cancelled=None):
+        # Search automa.position (P2 to move) to depth. Moves are handed out in automa's move order, and the
+        # first one is searched on its own so the rest start with a real alpha.
+        # return: (score, best move) like Automa.minmax
+        from helperClass.cpu import SearchCancelled
+
+        position = automa.position
+        moves = automa.order_moves(position, NO_MOVE)
+        if depth <= 1 or len(moves) <= 1:
+            return automa.minmax(depth, True)
+
+        # A new generation makes leftover tasks of a cancelled search stop within a few dozen nodes. Wait for them
+        # so the workers are free and nothing they return can be mistaken for this search's results.
+        generation = self.new_generation()
+        wait(self.in_flight)
+        self.in_flight = set()
+        self.nodes = 0
+        best_score, best_move = float("-inf"), None
+
+        pending = {self.executor.submit(_search_root_move, position.copy(), moves[0], depth, generation)}
+        queued = moves[1:]
+        while pending:
+            done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+            if cancelled is not None and cancelled.is_set():
+                self.new_generation()
+                self.in_flight = {future for future in pending if not future.cancel()}
+                raise SearchCancelled
+
+            for future in done:
+                result = future.result()
+                if result is None:
+                    continue
+                score, move, nodes, alpha = result
+                self.nodes += nodes
+                if score > alpha and score > best_score:
+                    best_score, best_move = score, move
+
+            # The first move is back, everything else can go out at once
+            if queued and not pending:
+                pending = {self.executor.submit(_search_root_move, position.copy(), move, depth, generation)
+                           for move in queued}
+                queued = []
+
+        return best_score, best_move
+
+
+def benchmark(depth: int = 8, max_workers: int = None, plies: int = 6):
+    # Time a fixed-depth search from a few plies into a game with 1, 2, 4, ... worker processes
+    from helperClass.cpu import Automa
+
+    position = Position.initial(P2)
+    for _ in range(plies):
+        position.play(position.legal_moves(suicides=False)[0])
+    if position.turn != P2:
+        position.play(position.legal_moves(suicides=False)[0])
+
+    max_workers = max_workers or multiprocessing.cpu_count()
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+
+    results = []
+    for workers in counts:
+        automa = Automa(SimpleNamespace(position=position), workers=workers)
+        if automa.parallel is not None:
+            # Start the worker processes before timing anything
+            automa.parallel.search(automa, 2)
+
+        automa.position = position.copy()
+        started = time.perf_counter()
+        if automa.parallel is not None:
+            score, move = automa.parallel.search(automa, depth)
+        else:
+            score, move = automa.minmax(depth, True)
+        elapsed = time.perf_counter() - started
+        automa.close()
+
+        results.append({"workers": workers, "depth": depth, "seconds": round(elapsed, 3), "score": score,
+                        "move": decode_move(move), "speedup": round(results[0]["seconds"] / elapsed, 2) if results
+                        else 1.0})
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    for result in benchmark(*map(int, sys.argv[1:])):
+        print(json.dumps(result))
@@ -0,0 +1,102 @@
+import time
+
+from helperClass.engine import Position, P1, P2, decode_move
+
+# Perft: count the positions reachable in exactly `depth` plies. It exercises move generation and make/unmake and
+# nothing else, which makes it both a throughput benchmark and a correctness check: a generator or rule change that
+# alters a count at any depth has changed what the game allows. Finished games have no moves, so a knock-out
+# only counts at the depth it happens.
+
+# Leaf counts from the initial position by first player and whether suicides are generated, depths 0, 1, 2, ...
+# Depths up to 3 were matched against the original Board.try_move/take_turn rules. Both players have the same
+# counts because the starting position is symmetric.
+REFERENCE = {
+    (P1, True): [1, 24, 569, 11997, 189102, 2865125, 42653705],
+    (P2, True): [1, 24, 569, 11997, 189102, 2865125, 42653705],
+    (P1, False): [1, 17, 281, 4292, 59822, 826592, 11388355],
+    (P2, False): [1, 17, 281, 4292, 59822, 826592, 11388355],
+}
+
+
+def perft(position, depth: int, suicides: bool = True) -> int:
+    if depth == 0:
+        return 1
+    if position.is_over():
+        return 0
+    if depth == 1:
+        return sum(1 for _ in position.generate_moves(suicides))
+
+    count = 0
+    for move in position.legal_moves(suicides):
+        undo = position.make_move(move)
+        count += perft(position, depth - 1, suicides)
+        position.unmake_move(undo)
+    return count
+
+
+def divide(position, depth: int, suicides: bool = True) -> dict:
+    # return: perft(depth - 1) after each root move, keyed by move
+    counts = {}
+    if position.is_over() or depth < 1:
+        return counts
+    for move in position.legal_moves(suicides):
+        undo = position.make_move(move)
+        counts[move] = perft(position, depth - 1, suicides)
+        position.unmake_move(undo)
+    return counts
+
+
+def check(max_depth: int = 4) -> list:
+    # return: (first player, suicides, depth, expected, counted) for every REFERENCE count that no longer matches
+    mismatches = []
+    for (turn, suicides), counts in REFERENCE.items():
+        for depth, expected in enumerate(counts[:max_depth + 1]):
+            counted = perft(Position.initial(turn), depth, suicides)
+            if counted != expected:
+                mismatches.append((turn, suicides, depth, expected, counted))
+    return mismatches
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(prog="python -m helperClass.perft",
+                                     description="Count leaf positions to a depth, with moves/sec.")
+    parser.add_argument("depth", type=int, nargs="?", default=4)
+    parser.add_argument("--first", choices=("p1", "p2"), default="p1", help="who moves first from the initial position")
+    parser.add_argument("--position", help="p1,p2,hole,turn[,p1_score,p2_score,last] instead of the initial position")
+    parser.add_argument("--no-suicides", action="store_true", help="skip suicides like the search does")
+    parser.add_argument("--divide", action="store_true", help="break the count down by root move")
+    parser.add_argument("--check", action="store_true", help="compare against the stored reference counts")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        mismatches = check(args.depth)
+        for mismatch in mismatches:
+            print(json.dumps(dict(zip(("first", "suicides", "depth", "expected", "counted"), mismatch))))
+        print("ok" if not mismatches else f"{len(mismatches)} mismatches")
+        raise SystemExit(1 if mismatches else 0)
+
+    if args.position:
+        position = Position(*map(int, args.position.split(",")))
+    else:
+        position = Position.initial(P1 if args.first == "p1" else P2)
+    suicides = not args.no_suicides
+
+    started = time.perf_counter()
+    if args.divide:
+        counts = divide(position, args.depth, suicides)
+        for move, count in counts.items():
+            print(json.dumps({"move": decode_move(move), "count": count}))
+        total = sum(counts.values())
+    else:
+        total = perft(position, args.depth, suicides)
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({"depth": args.depth, "count": total, "seconds": round(elapsed, 3),
+                      "moves_per_sec": round(total / elapsed) if elapsed else None}))
+
+
+if __name__ == "__main__":
+    main()
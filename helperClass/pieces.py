@@ -1,25 +1,49 @@
-import pygame
-from helperClass.constants import SQUARE_SIZE, BLACK, BLUE
+from helperClass.constants import SQUARE_SIZE, BLACK, BLUE, P1_COLOR, P2_COLOR, HOLE_COLOR
+from helperClass.engine import P1, P2, HOLE
 
 PLAYER_SIZE = 70
 HOLE_SIZE = 90
 PIECE_BORDER = 5
 
+# Drawing colour of each side code
+COLORS = {P1: P1_COLOR, P2: P2_COLOR, HOLE: HOLE_COLOR}
+
+# Rendered pieces by (kind, side, selected), drawn once and blitted from then on
+_sprites = {}
+
+
+def sprite_surface(size: int):
+    import pygame
+
+    # Transparent surface in the display's pixel format once there is a display, so blits needn't convert
+    surface = pygame.Surface((size, size), pygame.SRCALPHA)
+    return surface.convert_alpha() if pygame.display.get_surface() is not None else surface
+
 
 class Piece:
+    __slots__ = ("side", "row", "col", "x", "y", "selected")
+    SIZE = SQUARE_SIZE
 
-    def __init__(self, color, row, col):
-        self.color = color
+    def __init__(self, side, row, col):
+        # side is P1, P2 or HOLE
+        self.side = side
         self.row = row
         self.col = col
         self.x = 0
         self.y = 0
         self.calc_pos()
         self.selected = False
-        self.bg_color = BLACK
+
+    @property
+    def color(self):
+        return COLORS[self.side]
+
+    @property
+    def bg_color(self):
+        return BLUE if self.selected else BLACK
 
     def toggle_selected(self):
-        self.bg_color = BLUE if self.bg_color == BLACK else BLACK
+        self.selected = not self.selected
 
     def calc_pos(self):
         self.x = SQUARE_SIZE // 2 + self.col * SQUARE_SIZE
@@ -33,19 +57,42 @@ class Piece:
         self.col = col
         self.calc_pos()
 
+    def bounds(self) -> tuple:
+        # Screen area the piece covers, as (x, y, width, height)
+        return self.x - self.SIZE // 2, self.y - self.SIZE // 2, self.SIZE, self.SIZE
 
-class PlayerPiece(Piece):
+    def sprite(self):
+        key = type(self), self.side, self.selected
+        surface = _sprites.get(key)
+        if surface is None:
+            surface = _sprites[key] = sprite_surface(self.SIZE)
+            self.render(surface)
+        return surface
+
+    def render(self, surface):
+        raise NotImplementedError
 
     def draw(self, win):
-        pygame.draw.rect(win, self.bg_color,
-                         (self.x - PLAYER_SIZE // 2, self.y - PLAYER_SIZE // 2, PLAYER_SIZE, PLAYER_SIZE))
-        pygame.draw.rect(win, self.color, (
-            self.x - PLAYER_SIZE // 2 + PIECE_BORDER, self.y - PLAYER_SIZE // 2 + PIECE_BORDER,
-            PLAYER_SIZE - 2 * PIECE_BORDER, PLAYER_SIZE - 2 * PIECE_BORDER))
+        win.blit(self.sprite(), (self.x - self.SIZE // 2, self.y - self.SIZE // 2))
+
+
+class PlayerPiece(Piece):
+    __slots__ = ()
+    SIZE = PLAYER_SIZE
+
+    def render(self, surface):
+        surface.fill(self.bg_color)
+        surface.fill(self.color, (PIECE_BORDER, PIECE_BORDER, PLAYER_SIZE - 2 * PIECE_BORDER,
+                                  PLAYER_SIZE - 2 * PIECE_BORDER))
 
 
 class HolePiece(Piece):
+    __slots__ = ()
+    SIZE = HOLE_SIZE
 
-    def draw(self, win):
-        pygame.draw.circle(win, self.bg_color, (self.x, self.y), HOLE_SIZE // 2)
-        pygame.draw.circle(win, self.color, (self.x, self.y), (HOLE_SIZE // 2) - PIECE_BORDER)
+    def render(self, surface):
+        import pygame
+
+        center = HOLE_SIZE // 2, HOLE_SIZE // 2
+        pygame.draw.circle(surface, self.bg_color, center, HOLE_SIZE // 2)
+        pygame.draw.circle(surface, self.color, center, (HOLE_SIZE // 2) - PIECE_BORDER)
@@ -1,38 +1,37 @@
-import pygame
 from itertools import product
 
-from helperClass.constants import WHITE, GRAY, P1_COLOR, P2_COLOR, HOLE_COLOR, SQUARE_SIZE, SQUARE_PAD, ROWS, COLS
-from helperClass.pieces import Piece, PlayerPiece, HolePiece
+from helperClass.constants import WHITE, GRAY, P1_COLOR, P2_COLOR, SQUARE_SIZE, SQUARE_PAD, ROWS, COLS
+from helperClass.constants import WIDTH, HEIGHT
+from helperClass.engine import Position, P1, P2, HOLE, square, coords, iter_squares, encode_move, decode_move
+from helperClass.pieces import PlayerPiece, HolePiece
 from helperClass.scoreMaker import ScoreMarker
 
 
 class Board:
+    # The grid never changes, so it's drawn once per process and every frame starts from a copy of it
+    background = None
+
     def __init__(self, first_player):
 
         self.selected_piece = None
         self.target_square = None
 
-        self.last_move = [(-1, -1)]
-
-        self.turn = P1_COLOR if first_player == 0 else P2_COLOR
-
-        self.p1_score = 0
-        self.p2_score = 0
+        # Rules state: turn, scores and the no-reversal restriction all live here, pieces below are for drawing
+        self.position = Position.initial(P1 if first_player == 0 else P2)
 
-        self.square = pygame.Rect(0, 0, SQUARE_SIZE - SQUARE_PAD, SQUARE_SIZE - SQUARE_PAD)
         self.board = [[None] * COLS for j in range(ROWS)]
 
         self.p1_pieces = []
         self.p2_pieces = []
 
         for col in range(1, COLS - 1):
-            self.board[ROWS - 2][col] = PlayerPiece(P1_COLOR, ROWS - 2, col)  # pieces in 5th row
-            self.board[1][col] = PlayerPiece(P2_COLOR, 1, col)  # pieces in 1st row
+            self.board[ROWS - 2][col] = PlayerPiece(P1, ROWS - 2, col)  # pieces in 5th row
+            self.board[1][col] = PlayerPiece(P2, 1, col)  # pieces in 1st row
 
             self.p1_pieces.append(self.board[ROWS - 2][col])
             self.p2_pieces.append(self.board[1][col])
 
-        self.board[3][3] = HolePiece(HOLE_COLOR, 3, 3)
+        self.board[3][3] = HolePiece(HOLE, 3, 3)
         self.hole_piece = self.board[3][3]
 
         # Markers for scoring
@@ -42,26 +41,17 @@ class Board:
         self.score_markers.append(ScoreMarker(P2_COLOR, 4))
         self.score_markers.append(ScoreMarker(P2_COLOR, 5))
 
-    def __str__(self):
-        color_dict = {None: "0", P1_COLOR: "1", P2_COLOR: "2", HOLE_COLOR: "X"}
-        return "\n".join(["".join([color_dict[piece.color] if piece else "0" for piece in row]) for row in self.board])
-
-    def save_state(self, affected_spaces):
-
-        modified_spaces = tuple([tuple([row, col, self.board[row][col]]) for row, col in affected_spaces])
-        return self.turn, self.p1_score, self.p2_score, self.last_move[:], modified_spaces
+        # Screen areas that changed since the last draw(), or everything after invalidate()
+        self.dirty = []
+        self.full_redraw = True
 
-    def restore_state(self, state):
-
-        self.turn, self.p1_score, self.p2_score, self.last_move, modified_spaces = state
-        for row, col, piece in modified_spaces:
-            self.board[row][col] = piece
-            if piece is not None:
-                piece.move(row, col)
+    def __str__(self):
+        side_dict = {P1: "1", P2: "2", HOLE: "X"}
+        return "\n".join(["".join([side_dict[piece.side] if piece else "0" for piece in row]) for row in self.board])
 
     def set_selected(self, pos) -> None:
 
-        self.board[pos[0]][pos[1]].toggle_selected()
+        self.toggle_selected(pos)
         if pos == self.selected_piece:
             print("Deselected piece:", pos)
             self.selected_piece = None
@@ -82,29 +72,85 @@ class Board:
     def get_piece(self, pos):
         return self.board[pos[0]][pos[1]]
 
+    def snapshot(self) -> int:
+        # The rules state as an immutable value, see Position.snapshot()
+        return self.position.snapshot()
+
+    @staticmethod
+    def get_background():
+        import pygame
+
+        if Board.background is None:
+            square = pygame.Rect(0, 0, SQUARE_SIZE - SQUARE_PAD, SQUARE_SIZE - SQUARE_PAD)
+            background = pygame.Surface((WIDTH, HEIGHT))
+            if pygame.display.get_surface() is not None:
+                background = background.convert()
+            background.fill(GRAY)
+            for row, col in product(range(1, ROWS - 1), range(1, COLS - 1)):
+                square.center = ((SQUARE_SIZE // 2) + row * SQUARE_SIZE, (SQUARE_SIZE // 2) + col * SQUARE_SIZE)
+                background.fill(WHITE, square)
+            Board.background = background
+        return Board.background
+
     def draw_grid(self, win):
 
-        win.fill(GRAY)
-        for row, col in product(range(1, ROWS - 1), range(1, COLS - 1)):
-            self.square.center = ((SQUARE_SIZE // 2) + row * SQUARE_SIZE, (SQUARE_SIZE // 2) + col * SQUARE_SIZE)
-            pygame.draw.rect(win, WHITE, self.square)
+        win.blit(self.get_background(), (0, 0))
 
     def toggle_selected(self, pos):
 
-        self.board[pos[0]][pos[1]].toggle_selected()
+        piece = self.board[pos[0]][pos[1]]
+        piece.toggle_selected()
+        self.dirty.append(piece.bounds())
+
+    def pieces(self):
+        # Pieces on the board, hole first so pieces are never drawn under it
+        yield self.hole_piece
+        for piece in self.p1_pieces + self.p2_pieces:
+            if piece.row != -1:
+                yield piece
 
     def draw_pieces(self, win):
 
-        for row in range(ROWS):
-            for col in range(COLS):
-                if self.board[row][col] is not None:
-                    self.board[row][col].draw(win)
+        for piece in self.pieces():
+            piece.draw(win)
 
     def draw_score(self, win):
 
         for piece in self.score_markers:
             piece.draw(win)
 
+    def invalidate(self):
+        # Something else drew over the window (menu, message), so the next draw() repaints all of it
+        self.full_redraw = True
+
+    def draw(self, win) -> list:
+        # Repaint what changed since the last call
+        # return: the screen rects to pass to pygame.display.update(), empty if nothing changed
+        import pygame
+
+        if self.full_redraw:
+            self.full_redraw = False
+            self.dirty = []
+            self.draw_grid(win)
+            self.draw_pieces(win)
+            self.draw_score(win)
+            return [win.get_rect()]
+
+        if not self.dirty:
+            return []
+        rects = [pygame.Rect(bounds) for bounds in self.dirty]
+        self.dirty = []
+        background = self.get_background()
+        for rect in rects:
+            win.blit(background, rect, rect)
+        for piece in self.pieces():
+            if pygame.Rect(piece.bounds()).collidelist(rects) != -1:
+                piece.draw(win)
+        for marker in self.score_markers:
+            if pygame.Rect(marker.bounds).collidelist(rects) != -1:
+                marker.draw(win)
+        return rects
+
     @staticmethod
     def is_out_of_bounds(row, col) -> bool:
 
@@ -112,45 +158,22 @@ class Board:
 
     def is_turn(self, piece):
         # return: True if piece belongs to current player or is the Hole, False if opposite player's color
-        return piece.color == self.turn or piece.color == HOLE_COLOR
+        return piece.side == self.position.turn or piece.side == HOLE
 
     def get_turn_player(self):
         return self.turn
 
-    def try_move(self, current_row: int, current_col: int, target_row: int, target_col: int, pieces_moved=None):
-
-        if pieces_moved is None:
-            pieces_moved = []
-
-        # Check for invalid move - cannot push Hole off of board or onto another piece
-        if self.board[current_row][current_col].get_color() == HOLE_COLOR and (
-                self.is_out_of_bounds(target_row, target_col) or self.board[target_row][target_col] is not None):
-            return None
-
-        # Move may be good. Add to list of pieces moved this time and test further
-        pieces_moved.append((current_row, current_col))
-
-        # Pushing a piece off the board or into the hole eliminates it, so there's no way this move is duplicating the
-        # last board state. Move successful.
-        if self.is_out_of_bounds(target_row, target_col) or self.board[target_row][target_col] is not None and \
-                self.board[target_row][target_col].color == HOLE_COLOR:
-            pieces_moved.append((target_row, target_col))
-            return pieces_moved
+    @property
+    def turn(self):
+        return P1_COLOR if self.position.turn == P1 else P2_COLOR
 
-        # Pushing a piece into another piece requires recursion
-        if self.board[target_row][target_col] is not None:
-            ph_row, ph_col = target_row, target_col
-            target_row, target_col = 2 * target_row - current_row, 2 * target_col - current_col
-            current_row, current_col = ph_row, ph_col
-            return self.try_move(current_row, current_col, target_row, target_col, pieces_moved)
+    @property
+    def p1_score(self):
+        return self.position.p1_score
 
-        # Pushing onto an empty square is valid, but we have to check if we are simply reversing the last move made,
-        # and returning to the preceding board position which is invalid.
-        pieces_moved.append((target_row, target_col))
-        if pieces_moved == list(reversed(self.last_move)):
-            return None
-
-        return pieces_moved
+    @property
+    def p2_score(self):
+        return self.position.p2_score
 
     def is_adjacent(self, current_row: int, current_col: int, target_row: int, target_col: int):
 
@@ -159,14 +182,6 @@ class Board:
 
         return (row_delta == 0 and col_delta == 1) or (row_delta == 1 and col_delta == 0)
 
-    def drop_piece(self, piece: Piece) -> None:
-
-        piece.move(-1, -1)
-        if piece.get_color() == P2_COLOR:
-            self.p1_score += 1
-        else:
-            self.p2_score += 1
-
     def get_winner(self):
         if self.p1_score == 2:
             return P1_COLOR
@@ -178,6 +193,7 @@ class Board:
 
     def update_score_markers(self):
 
+        active = [marker.curr_color for marker in self.score_markers]
         if self.p1_score == 1:
             self.score_markers[2].activate()
         if self.p1_score == 2:
@@ -186,26 +202,47 @@ class Board:
             self.score_markers[0].activate()
         if self.p2_score == 2:
             self.score_markers[1].activate()
+        self.dirty.extend(marker.bounds for marker, color in zip(self.score_markers, active)
+                          if marker.curr_color != color)
 
-    def move_pieces(self, move_list: list((int, int))) -> None:
-
-        target_row, target_col = move_list.pop()
-        while move_list:
-            if self.is_out_of_bounds(target_row, target_col) or self.board[target_row][target_col] is not None and \
-                    self.board[target_row][target_col].color == HOLE_COLOR:
-                self.drop_piece(self.board[move_list[-1][0]][move_list[-1][1]])
-                self.board[move_list[-1][0]][move_list[-1][1]] = None
-                # Dropping a piece means the next move cannot be a reverse of the current one
-                # We reset last_move to avoid edge case where dropping a piece into the hole makes it so the
-                # hole can't be moved
-                self.last_move = [(-1, -1)]
-            else:
-                self.board[move_list[-1][0]][move_list[-1][1]].move(target_row, target_col)
-                self.board[target_row][target_col] = self.board[move_list[-1][0]][move_list[-1][1]]
-                self.board[move_list[-1][0]][move_list[-1][1]] = None
-
-            if move_list:
-                target_row, target_col = move_list.pop()
+    def sync(self):
+        # Lay the drawable pieces out to match self.position. Pieces whose square is still occupied by their color
+        # stay put and the rest fill the newly occupied squares, or leave the board if they were knocked out.
+        self.board = [[None] * COLS for j in range(ROWS)]
+        before = {piece: (piece.row, piece.col) for piece in self.p1_pieces + self.p2_pieces + [self.hole_piece]}
+
+        for pieces, mask in ((self.p1_pieces, self.position.p1), (self.p2_pieces, self.position.p2)):
+            displaced = []
+            for piece in pieces:
+                sq = square(piece.row, piece.col)
+                if piece.row != -1 and mask >> sq & 1:
+                    mask ^= 1 << sq
+                else:
+                    displaced.append(piece)
+
+            free = iter_squares(mask)
+            for piece in displaced:
+                sq = next(free, None)
+                piece.move(*coords(sq)) if sq is not None else piece.move(-1, -1)
+
+            for piece in pieces:
+                if piece.row != -1:
+                    self.board[piece.row][piece.col] = piece
+
+        self.hole_piece.move(*coords(self.position.hole))
+        self.board[self.hole_piece.row][self.hole_piece.col] = self.hole_piece
+
+        # Both the square a piece left and the one it arrived on need repainting
+        for piece, (row, col) in before.items():
+            if (piece.row, piece.col) != (row, col):
+                if row != -1:
+                    self.dirty.append((col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+                if piece.row != -1:
+                    self.dirty.append(piece.bounds())
+
+    def legal_moves(self) -> list:
+        # return: (row, col, target_row, target_col) for every move the turn player can make
+        return [decode_move(move) for move in self.position.legal_moves()]
 
     def take_turn(self, current_row: int, current_col: int, target_row: int, target_col: int, hypothetical=False):
 
@@ -217,17 +254,15 @@ class Board:
             print("Squares are not adjacent")
             return False
 
-        moved = self.try_move(current_row, current_col, target_row, target_col)
-        if not moved:
+        # Same move generator the search uses, the drawable pieces just follow the position
+        move = encode_move(current_row, current_col, target_row, target_col)
+        if move not in self.position.legal_moves():
             return False
+        self.position.make_move(move)
 
-        # This will be a valid move. Now actually move the pieces, record as the last move, and change turn player
-        self.last_move = moved[:]
-        self.move_pieces(moved)
+        self.sync()
 
         # Update score markers if this is real move and not AI projection
         hypothetical or self.update_score_markers()
 
-        self.turn = P2_COLOR if self.turn == P1_COLOR else P1_COLOR
-
         return True
@@ -0,0 +1,52 @@
+import random
+
+# Parent selection for the genetic engine. Each function picks `count` distinct indices into `scores` without
+# rejection sampling, so it always finishes: tournament is O(count * size), rank and roulette are O(n log n).
+
+
+def tournament(scores: list, count: int, rng: random.Random, maximize: bool = True, size: int = 2) -> list:
+    # Each tournament draws `size` entrants from those not picked yet and the best one is picked
+    pool = list(range(len(scores)))
+    count = min(count, len(pool))
+    picked = []
+    for _ in range(count):
+        entrants = rng.sample(range(len(pool)), min(size, len(pool)))
+        if maximize:
+            winner = max(entrants, key=lambda i: scores[pool[i]])
+        else:
+            winner = min(entrants, key=lambda i: scores[pool[i]])
+        picked.append(pool[winner])
+
+        # Swap-remove the winner from the pool
+        pool[winner] = pool[-1]
+        pool.pop()
+    return picked
+
+
+def _weighted_sample(weights: list, count: int, rng: random.Random) -> list:
+    # Weighted sampling without replacement (Efraimidis-Spirakis): the count largest of u ** (1 / w)
+    keys = [(rng.random() ** (1.0 / weight), i) for i, weight in enumerate(weights)]
+    keys.sort(reverse=True)
+    return [i for _, i in keys[:count]]
+
+
+def rank(scores: list, count: int, rng: random.Random, maximize: bool = True) -> list:
+    # Chance grows linearly with rank: the worst entry has weight 1, the best has weight n
+    order = sorted(range(len(scores)), key=scores.__getitem__, reverse=not maximize)
+    weights = [0] * len(scores)
+    for position, i in enumerate(order):
+        weights[i] = position + 1
+    return _weighted_sample(weights, min(count, len(scores)), rng)
+
+
+def roulette(scores: list, count: int, rng: random.Random, maximize: bool = True) -> list:
+    # Chance proportional to how far a score is above the worst one. The worst still gets a sliver so every entry
+    # stays selectable.
+    if not scores:
+        return []
+    worst = min(scores) if maximize else max(scores)
+    weights = [abs(score - worst) + 1e-3 for score in scores]
+    return _weighted_sample(weights, min(count, len(scores)), rng)
+
+
+SELECTIONS = {"tournament": tournament, "rank": rank, "roulette": roulette}
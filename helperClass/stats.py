@@ -0,0 +1,37 @@
+MAX_DEPTH = 64
+
+# Trace events, passed as the first argument to SearchStats.trace
+NODE, LEAF, CUTOFF, RESULT = "node", "leaf", "cutoff", "result"
+
+
+class SearchStats:
+    # Per-depth search counters, indexed by remaining depth. Automa only touches these when it was created with
+    # stats enabled; otherwise the search carries a single None check per node and nothing else.
+
+    def __init__(self, trace=None):
+        # Optional callable trace(event, depth, position, detail), detail is the move for NODE/CUTOFF events, the
+        # static score for LEAF events and (score, move) for the RESULT event that ends every find_move()
+        self.trace = trace
+        self.reset()
+
+    def reset(self):
+        self.nodes = [0] * MAX_DEPTH
+        self.leaves = [0] * MAX_DEPTH
+        self.cutoffs = [0] * MAX_DEPTH
+        self.tt_probes = [0] * MAX_DEPTH
+        self.tt_hits = [0] * MAX_DEPTH
+        self.elapsed = 0.0
+        self.result = None
+
+    def total(self, counter: str) -> int:
+        return sum(getattr(self, counter))
+
+    def as_dict(self) -> dict:
+        # Trailing all-zero depths are trimmed so the result reads naturally for a search of any depth
+        depth = max((d for d in range(MAX_DEPTH) if self.nodes[d] or self.leaves[d]), default=0) + 1
+        counters = {}
+        for name in ("nodes", "leaves", "cutoffs", "tt_probes", "tt_hits"):
+            counters[name] = getattr(self, name)[:depth]
+        counters["elapsed"] = self.elapsed
+        counters["result"] = self.result
+        return counters
@@ -0,0 +1,111 @@
+from helperClass.engine import Position, SIZE, SQUARES, P1, P2, NO_MOVE, iter_squares
+from helperClass.engine import ZOBRIST_PIECE, ZOBRIST_HOLE, ZOBRIST_LAST, ZOBRIST_SCORE
+from helperClass.transposition import LOWER, UPPER
+
+# Symmetries of the game. The board and the hole's starting square are left-right symmetric, so MIRROR maps a
+# position to an equivalent one. SWAP exchanges the colours and flips the board vertically, which turns P1's start
+# into P2's: the swapped position is the same game with the sides' roles exchanged, so its value from P2's point of
+# view is negated. SWAP_MIRROR does both. Each symmetry is its own inverse.
+#
+# canonical() picks one representative per class of equivalent positions. Anything stored under the
+# representative (search results, opening data, tablebase entries) is shared by the whole class, and a move
+# stored there is mapped back to the original orientation with transform_move(move, sym).
+
+IDENTITY, MIRROR, SWAP, SWAP_MIRROR = 0, 1, 2, 3
+
+# Squares and directions (up, down, left, right) under each symmetry
+_MIRROR = tuple(sq - sq % SIZE + SIZE - 1 - sq % SIZE for sq in range(SQUARES))
+_FLIP = tuple((SIZE - 1 - sq // SIZE) * SIZE + sq % SIZE for sq in range(SQUARES))
+SQUARE_MAP = (tuple(range(SQUARES)), _MIRROR, _FLIP, tuple(_MIRROR[_FLIP[sq]] for sq in range(SQUARES)))
+DIRECTION_MAP = ((0, 1, 2, 3), (0, 1, 3, 2), (1, 0, 2, 3), (1, 0, 3, 2))
+MOVE_MAP = tuple(tuple(squares[move >> 2] * 4 + directions[move & 3] for move in range(SQUARES * 4))
+                 for squares, directions in zip(SQUARE_MAP, DIRECTION_MAP))
+
+# Masks are mirrored one row (5 bits) at a time
+_ROW_MASK = (1 << SIZE) - 1
+_MIRROR_ROW = tuple(sum(1 << (SIZE - 1 - col) for col in range(SIZE) if bits >> col & 1) for bits in range(1 << SIZE))
+_ROW_SHIFTS = tuple(row * SIZE for row in range(SIZE))
+
+
+def mirror_mask(mask: int) -> int:
+    out = 0
+    for shift in _ROW_SHIFTS:
+        out |= _MIRROR_ROW[mask >> shift & _ROW_MASK] << shift
+    return out
+
+
+def flip_mask(mask: int) -> int:
+    out = 0
+    for shift in _ROW_SHIFTS:
+        out |= (mask >> shift & _ROW_MASK) << (SQUARES - SIZE - shift)
+    return out
+
+
+def transform_mask(mask: int, sym: int) -> int:
+    if sym & SWAP:
+        mask = flip_mask(mask)
+    if sym & MIRROR:
+        mask = mirror_mask(mask)
+    return mask
+
+
+def transform_move(move: int, sym: int) -> int:
+    return move if move == NO_MOVE else MOVE_MAP[sym][move]
+
+
+def transform(position, sym: int):
+    p1, p2 = transform_mask(position.p1, sym), transform_mask(position.p2, sym)
+    hole = SQUARE_MAP[sym][position.hole]
+    last = transform_move(position.last, sym)
+    if sym & SWAP:
+        return Position(p2, p1, hole, P1 if position.turn == P2 else P2, position.p2_score, position.p1_score, last)
+    return Position(p1, p2, hole, position.turn, position.p1_score, position.p2_score, last)
+
+
+def _key(p1: int, p2: int, hole: int, p1_score: int, p2_score: int, last: int) -> int:
+    # Position.compute_key() for a position with P1 to move, without building the Position
+    key = ZOBRIST_HOLE[hole] ^ ZOBRIST_SCORE[P1][p1_score] ^ ZOBRIST_SCORE[P2][p2_score]
+    for sq in iter_squares(p1):
+        key ^= ZOBRIST_PIECE[P1][sq]
+    for sq in iter_squares(p2):
+        key ^= ZOBRIST_PIECE[P2][sq]
+    if last != NO_MOVE:
+        key ^= ZOBRIST_LAST[last]
+    return key
+
+
+def canonical_key(position) -> (int, int):
+    # return: (Zobrist key of the class representative, symmetry that maps position onto it). The representative
+    # always has P1 to move, so only the two images with P1 to move are compared.
+    if position.turn == P1:
+        p1, p2, hole, last = position.p1, position.p2, position.hole, position.last
+        p1_score, p2_score = position.p1_score, position.p2_score
+        sym = IDENTITY
+    else:
+        p1, p2 = flip_mask(position.p2), flip_mask(position.p1)
+        hole, last = _FLIP[position.hole], transform_move(position.last, SWAP)
+        p1_score, p2_score = position.p2_score, position.p1_score
+        sym = SWAP
+
+    mirrored = (mirror_mask(p1), mirror_mask(p2), _MIRROR[hole], transform_move(last, MIRROR))
+    if mirrored < (p1, p2, hole, last):
+        return _key(*mirrored[:3], p1_score, p2_score, mirrored[3]), sym | MIRROR
+    if sym == IDENTITY:
+        return position.key, IDENTITY
+    return _key(p1, p2, hole, p1_score, p2_score, last), SWAP
+
+
+def canonical(position):
+    # return: (class representative, symmetry that maps position onto it)
+    _, sym = canonical_key(position)
+    return transform(position, sym) if sym != IDENTITY else position.copy(), sym
+
+
+def transform_entry(flag: int, value, move: int, sym: int):
+    # Map a stored (flag, value, move) between a position and its image under sym, either way. Values are from
+    # P2's point of view, so a colour swap negates them and turns lower bounds into upper bounds.
+    move = transform_move(move, sym)
+    if sym & SWAP and value is not None:
+        value = -value
+        flag = UPPER if flag == LOWER else LOWER if flag == UPPER else flag
+    return flag, value, move
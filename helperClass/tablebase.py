@@ -0,0 +1,332 @@
+import mmap
+import os
+import struct
+from array import array
+from itertools import combinations
+from math import comb
+
+from helperClass.engine import Position, P1, P2, SQUARES
+
+# Endgame tablebases. A class is every position with n1 P1 pieces and n2 P2 pieces on the board and the scores at
+# s1 and s2, with either side to move and the hole anywhere. Positions are indexed densely by (turn, hole, P1's
+# squares, P2's squares) in the combinatorial number system, so a class is three byte planes on disk:
+#
+#   best    outcome for the side to move with every move allowed
+#   move    the move that achieves it
+#   second  outcome when that move is the forbidden reversal (Position.last)
+#
+# The forbidden move is thereby covered without putting it in the index: with any other move forbidden the best
+# outcome is still available. Files are read through mmap, so a probe touches a few pages and nothing is loaded
+# up front.
+#
+# Material classes follow from the scores in real play (each side has 5 - opponent's score pieces), and 4v4 at 1-1
+# alone is ~1.29G positions, which this generator can't build. Tables are for smaller synthetic endings, and Automa
+# probes one only when it is handed a Tablebase.
+#
+# Outcome bytes: UNKNOWN, a win in 0..126 plies, a loss in 0..126 plies, or DRAW. Positions that can't be settled
+# within the generator's depth limit, or that depend on a class that hasn't been generated, stay UNKNOWN.
+
+UNKNOWN = 0
+WIN = 1
+LOSS = 128
+DRAW = 255
+NO_BEST = 255
+MAX_PLIES = 126
+
+MAGIC = b"KOTB"
+HEADER = struct.Struct("<4s4BHH")
+
+
+def win(plies: int) -> int:
+    return WIN + plies
+
+
+def loss(plies: int) -> int:
+    return LOSS + plies
+
+
+def is_win(outcome: int) -> bool:
+    return WIN <= outcome < LOSS
+
+
+def is_loss(outcome: int) -> bool:
+    return LOSS <= outcome < DRAW
+
+
+def back(outcome: int) -> int:
+    # Outcome for the player whose move led to a position with this outcome for the side to move there
+    if outcome == UNKNOWN or outcome == DRAW:
+        return outcome
+    if is_loss(outcome):
+        return win(min(outcome - LOSS + 1, MAX_PLIES))
+    return loss(min(outcome - WIN + 1, MAX_PLIES))
+
+
+def _preference(outcome: int) -> tuple:
+    # Sort key for the side to move: quick wins, then longer wins, draws, long losses and quick losses
+    if is_win(outcome):
+        return 2, -outcome
+    if outcome == DRAW:
+        return 1, 0
+    return 0, outcome
+
+
+def _rank(mask: int, excluded: int) -> int:
+    # Colex rank of mask's squares counted among the squares not in excluded
+    rank = 0
+    i = 0
+    while mask:
+        low = mask & -mask
+        sq = low.bit_length() - 1
+        rank += comb(sq - (excluded & (low - 1)).bit_count(), i + 1)
+        mask ^= low
+        i += 1
+    return rank
+
+
+def class_of(position) -> tuple:
+    return position.p1.bit_count(), position.p2.bit_count(), position.p1_score, position.p2_score
+
+
+def file_name(material: tuple) -> str:
+    return "%d%d-%d%d.tb" % material
+
+
+class Table:
+    # Indexing for one class, plus its planes when opened from a file
+
+    def __init__(self, n1: int, n2: int, s1: int, s2: int):
+        self.material = n1, n2, s1, s2
+        self.p1_count = comb(SQUARES - 1, n1)
+        self.p2_count = comb(SQUARES - 1 - n1, n2)
+        self.size = 2 * SQUARES * self.p1_count * self.p2_count
+        self.planes = None
+        self.header = None
+
+    def index(self, position) -> int:
+        hole_bit = 1 << position.hole
+        p1_rank = _rank(position.p1, hole_bit)
+        p2_rank = _rank(position.p2, hole_bit | position.p1)
+        return ((position.turn * SQUARES + position.hole) * self.p1_count + p1_rank) * self.p2_count + p2_rank
+
+    def positions(self):
+        # Every position in the class, with no forbidden move
+        n1, n2, s1, s2 = self.material
+        for turn in (P1, P2):
+            for hole in range(SQUARES):
+                squares = [sq for sq in range(SQUARES) if sq != hole]
+                for p1_squares in combinations(squares, n1):
+                    p1 = sum(1 << sq for sq in p1_squares)
+                    rest = [sq for sq in squares if not p1 >> sq & 1]
+                    for p2_squares in combinations(rest, n2):
+                        yield Position(p1, sum(1 << sq for sq in p2_squares), hole, turn, s1, s2)
+
+    @classmethod
+    def open(cls, path: str):
+        with open(path, "rb") as file:
+            planes = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n1, n2, s1, s2, passes, flags = HEADER.unpack_from(planes)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a tablebase file")
+        table = cls(n1, n2, s1, s2)
+        if len(planes) != HEADER.size + 3 * table.size:
+            raise ValueError(f"{path} is truncated")
+        table.planes = planes
+        table.header = {"passes": passes, "complete": bool(flags & 1)}
+        return table
+
+    def close(self):
+        if self.planes is not None:
+            self.planes.close()
+            self.planes = None
+
+    def entry(self, index: int) -> (int, int, int):
+        offset = HEADER.size + index
+        planes = self.planes
+        return planes[offset], planes[offset + self.size], planes[offset + 2 * self.size]
+
+    def probe(self, position) -> int:
+        # return: outcome for the side to move in position, UNKNOWN if not settled
+        best, move, second = self.entry(self.index(position))
+        return second if move == position.last and move != NO_BEST else best
+
+
+class Tablebase:
+    # Every class file in a directory, opened lazily by material
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.tables = {}
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else ():
+            if name.endswith(".tb"):
+                table = Table.open(os.path.join(directory, name))
+                self.tables[table.material] = table
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.tables)
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+
+    def probe(self, position) -> int:
+        # return: outcome for the side to move, UNKNOWN if no table covers position or it isn't settled
+        table = self.tables.get(class_of(position))
+        if table is None:
+            return UNKNOWN
+        outcome = table.probe(position)
+        self.hits += outcome != UNKNOWN
+        return outcome
+
+
+def _settle(outcomes: list, moves, first: int, values: bytearray, free: int, unknown_is_draw: bool) -> int:
+    # Work out the position's outcome with every move allowed (into values[free]) and with each of its own moves
+    # forbidden in turn (into values[first + i]) from the outcomes of its moves. A win stands even with moves still
+    # unknown, because those can only turn into slower wins. No moves at all is a loss, like in the search.
+    # return: the move achieving values[free], or NO_BEST
+    top = second = None
+    unknown = 0
+    for i, outcome in enumerate(outcomes):
+        if outcome == UNKNOWN:
+            if not unknown_is_draw:
+                unknown += 1
+                continue
+            outcomes[i] = outcome = DRAW
+        if top is None or _preference(outcome) > _preference(outcomes[top]):
+            top, second = i, top
+        elif second is None or _preference(outcome) > _preference(outcomes[second]):
+            second = i
+
+    def pick(best, unknown_left):
+        if best is None:
+            return UNKNOWN if unknown_left else loss(0)
+        return UNKNOWN if unknown_left and not is_win(outcomes[best]) else outcomes[best]
+
+    values[free] = pick(top, unknown)
+    for i, outcome in enumerate(outcomes):
+        if outcome == UNKNOWN:
+            values[first + i] = pick(top, unknown - 1)
+        else:
+            values[first + i] = pick(second if i == top else top, unknown)
+    return moves[first + top] if top is not None and values[free] != UNKNOWN else NO_BEST
+
+
+def generate(material: tuple, directory: str, max_plies: int = MAX_PLIES, progress=None) -> dict:
+    # Solve one class by retrograde iteration and write it to directory. Pass k settles everything that is won or
+    # lost in k plies, reading only what earlier passes settled. Captures that leave the class are read from that
+    # class's file when it exists. When nothing changes any more and no move leaves for a missing class, whatever
+    # is left is a draw.
+    # progress(pass, settled): optional callback after every pass
+    # return: summary counts
+    table = Table(*material)
+    other = Tablebase(directory)
+    closed = True
+
+    # While solving, every position has a value with all moves allowed and one with each of its moves forbidden,
+    # because the second kind can be settled before the first. Slots first..first + len(moves) - 1 hold the
+    # forbidden-move values in move order and slot `total + index` the free one.
+    starts = array("q", bytes(8 * table.size))
+    ends = array("q", bytes(8 * table.size))
+    moves = array("b")
+    for position in table.positions():
+        index = table.index(position)
+        starts[index] = len(moves)
+        moves.extend(position.legal_moves())
+        ends[index] = len(moves)
+    total = len(moves)
+
+    # The slot each move leads to, or -1 - the outcome there when it's known up front
+    children = array("q", bytes(8 * total))
+    for position in table.positions():
+        i = starts[table.index(position)]
+        for move in position.legal_moves():
+            undo = position.make_move(move)
+            if position.is_over():
+                child = -1 - (loss(0) if position.get_winner() != position.turn else win(0))
+            elif class_of(position) == material:
+                target = table.index(position)
+                child = total + target
+                for j in range(starts[target], ends[target]):
+                    if moves[j] == position.last:
+                        child = j
+                        break
+            else:
+                if class_of(position) not in other.tables:
+                    closed = False
+                child = -1 - other.probe(position)
+            position.unmake_move(undo)
+            children[i] = child
+            i += 1
+    other.close()
+
+    values = bytearray(total + table.size)
+    best_move = bytearray([NO_BEST]) * table.size
+
+    def solve(index: int, previous: bytes, unknown_is_draw: bool) -> bool:
+        # return: whether every value of the position is settled
+        first = starts[index]
+        outcomes = [back(-1 - child if child < 0 else previous[child]) for child in children[first:ends[index]]]
+        best_move[index] = _settle(outcomes, moves, first, values, total + index, unknown_is_draw)
+        return values[total + index] != UNKNOWN and UNKNOWN not in values[first:ends[index]]
+
+    unsettled = list(range(table.size))
+    passes = 0
+    changed = True
+    while unsettled and passes < max_plies:
+        passes += 1
+        previous = bytes(values)
+        unsettled = [index for index in unsettled if not solve(index, previous, False)]
+        changed = values != previous
+        if progress is not None:
+            progress(passes, table.size - len(unsettled))
+        if not changed:
+            break
+
+    # In a closed class that stopped changing, everything left is a draw
+    complete = not unsettled or (closed and not changed)
+    if unsettled and complete:
+        previous = bytes(values)
+        for index in unsettled:
+            solve(index, previous, True)
+
+    best = values[total:]
+    second = bytearray(table.size)
+    for index, move in enumerate(best_move):
+        if move != NO_BEST:
+            second[index] = values[starts[index] + moves[starts[index]:ends[index]].index(move)]
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, file_name(material))
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, *material, passes, int(complete)))
+        file.write(best)
+        file.write(best_move)
+        file.write(second)
+
+    return {"class": file_name(material)[:-3], "positions": table.size, "passes": passes, "complete": complete,
+            "wins": sum(is_win(outcome) for outcome in best), "losses": sum(is_loss(outcome) for outcome in best),
+            "draws": best.count(DRAW), "unknown": best.count(UNKNOWN), "bytes": HEADER.size + 3 * table.size}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(prog="python -m helperClass.tablebase",
+                                     description="Solve an endgame class by retrograde analysis.")
+    parser.add_argument("n1", type=int, help="P1 pieces on the board")
+    parser.add_argument("n2", type=int, help="P2 pieces on the board")
+    parser.add_argument("s1", type=int, help="P1's score (P2 pieces knocked out)")
+    parser.add_argument("s2", type=int, help="P2's score (P1 pieces knocked out)")
+    parser.add_argument("--dir", default="tablebases")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES, help="stop after settling wins this long")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    summary = generate((args.n1, args.n2, args.s1, args.s2), args.dir, args.max_plies,
+                       lambda passes, settled: print(f"pass {passes}: {settled} settled", flush=True))
+    summary["seconds"] = round(time.perf_counter() - started, 1)
+    print(json.dumps(summary))
@@ -0,0 +1,217 @@
+import argparse
+import json
+import math
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from helperClass.cpu import Automa, MINMAX, GENETIC, MONTE_CARLO, MAX_PLY
+from helperClass.engine import Position, P1, P2, encode_move
+
+# Headless self-play. Engines are named by spec strings:
+#   minmax:D    fixed-depth alpha-beta to depth D
+#   id:D:T      alpha-beta iterative deepening up to depth D within T seconds
+#   ga          the genetic "Guest" engine
+#   mcts:N      Monte Carlo tree search with N iterations
+# Automa always searches for P2, so an engine playing P1 is handed the position with the colours swapped. The
+# rules and evaluate() don't care which colour is which, and moves are the same squares in both views.
+
+# How each engine's spec may be written, by the number of fields after its name
+SPEC_FORMS = {"minmax": {1: "minmax:D"}, "id": {2: "id:D:T"}, "ga": {0: "ga"}, "mcts": {0: "mcts", 1: "mcts:N"}}
+
+
+def swap_colors(position):
+    return Position(position.p2, position.p1, position.hole, P1 if position.turn == P2 else P2,
+                    position.p2_score, position.p1_score, position.last)
+
+
+class Player:
+
+    def __init__(self, spec: str):
+        name, *args = spec.split(":")
+        self.spec = spec
+        self.board = SimpleNamespace(position=Position.initial(P2))
+        self.automa = Automa(self.board)
+        self.time_limit = None
+        self.difficulty = 0
+        self.engine = MINMAX
+
+        if name not in SPEC_FORMS:
+            raise ValueError(f"Unknown engine {spec!r}")
+        if len(args) not in SPEC_FORMS[name]:
+            raise ValueError(f"{spec!r}: expected {' or '.join(SPEC_FORMS[name].values())}")
+        try:
+            if name == "minmax":
+                self.difficulty = int(args[0])
+            elif name == "id":
+                self.difficulty, self.time_limit = int(args[0]), float(args[1])
+            elif name == "ga":
+                self.engine = GENETIC
+            else:
+                self.engine = MONTE_CARLO
+                if args:
+                    self.automa.monte_carlo.iterations = int(args[0])
+        except ValueError:
+            raise ValueError(f"{spec!r}: depth and iterations must be integers, time limits numbers") from None
+
+        # Alpha-beta specs always run alpha-beta (engine=MINMAX), whatever find_move() makes of the depth by default
+        if self.engine == MINMAX and not 1 <= self.difficulty < MAX_PLY:
+            raise ValueError(f"{spec!r}: depth must be between 1 and {MAX_PLY - 1}")
+        if self.time_limit is not None and self.time_limit <= 0:
+            raise ValueError(f"{spec!r}: time limit must be positive")
+        if self.engine == MONTE_CARLO and self.automa.monte_carlo.iterations < 1:
+            raise ValueError(f"{spec!r}: iterations must be positive")
+
+    def work(self) -> int:
+        # Search effort so far: interior nodes for alpha-beta, playouts for MCTS, nothing for the GA
+        if self.engine == MONTE_CARLO:
+            return self.automa.monte_carlo.total_playouts
+        return self.automa.cnt
+
+    def choose(self, position) -> int:
+        self.board.position = position if position.turn == P2 else swap_colors(position)
+        _, move = self.automa.find_move(self.difficulty, self.time_limit, engine=self.engine)
+        return move
+
+    def close(self):
+        self.automa.close()
+
+
+def play_game(specs: tuple, first: int, seed: int, opening_plies: int, max_plies: int) -> dict:
+    # Play specs[0] as P1 against specs[1] as P2, first to move being P1 or P2. A few random opening plies keep
+    # deterministic engines from replaying the same game.
+    # return: the winner (0, 1 or None for specs' index) and per-engine move latencies and work
+    rng = random.Random(seed)
+    players = [Player(spec) for spec in specs]
+    position = Position.initial(first)
+    latencies = [[], []]
+    work = [0, 0]
+
+    for _ in range(opening_plies):
+        moves = position.legal_moves(suicides=False)
+        if not moves or position.is_over():
+            break
+        position.play(rng.choice(moves))
+
+    plies = 0
+    while not position.is_over() and plies < max_plies:
+        side = 0 if position.turn == P1 else 1
+        player = players[side]
+        start_work = player.work()
+        started = time.perf_counter()
+        move = player.choose(position)
+        latencies[side].append(time.perf_counter() - started)
+        work[side] += player.work() - start_work
+
+        if move is None or not position.play(encode_move(*move)):
+            # An engine with nothing to play (or an illegal answer) loses
+            position.p1_score, position.p2_score = (0, 2) if side == 0 else (2, 0)
+            break
+        plies += 1
+
+    for player in players:
+        player.close()
+
+    winner = position.get_winner()
+    return {"winner": None if winner is None else (0 if winner == P1 else 1), "plies": plies,
+            "latencies": latencies, "work": work,
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def percentile(values: list, fraction: float) -> float:
+    # Nearest-rank percentile of sorted values: the smallest value with at least fraction of them at or below it.
+    # fraction * len is rounded first so float error (0.07 * 100 == 7.000000000000001) can't push it up a rank.
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(round(fraction * len(values), 9)) - 1))]
+
+
+def summarize(spec: str, games: list, index_of) -> dict:
+    # index_of(game): which side spec played in that game
+    latencies = sorted(latency for game in games for latency in game["latencies"][index_of(game)])
+    work = sum(game["work"][index_of(game)] for game in games)
+    thinking = sum(latencies)
+    wins = sum(game["winner"] == index_of(game) for game in games)
+    draws = sum(game["winner"] is None for game in games)
+    return {
+        "engine": spec,
+        "wins": wins,
+        "losses": len(games) - wins - draws,
+        "draws": draws,
+        "win_rate": round(wins / len(games), 3) if games else None,
+        "moves": len(latencies),
+        "latency_ms": {
+            "avg": round(1000 * thinking / len(latencies), 3) if latencies else None,
+            "p50": round(1000 * percentile(latencies, 0.50), 3) if latencies else None,
+            "p95": round(1000 * percentile(latencies, 0.95), 3) if latencies else None,
+            "p99": round(1000 * percentile(latencies, 0.99), 3) if latencies else None,
+        },
+        "nodes_per_sec": round(work / thinking) if work and thinking else None,
+    }
+
+
+def run(engine_a: str, engine_b: str, games: int = 10, workers: int = None, seed: int = 0, opening_plies: int = 2,
+        max_plies: int = 200) -> dict:
+    # Engines swap colours every game and who moves first every other game. Bad specs fail here, not in a worker.
+    Player(engine_a).close()
+    Player(engine_b).close()
+
+    jobs = []
+    for game in range(games):
+        specs = (engine_a, engine_b) if game % 2 == 0 else (engine_b, engine_a)
+        first = P1 if game // 2 % 2 == 0 else P2
+        jobs.append((specs, first, seed + game, opening_plies, max_plies))
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(workers) as executor:
+        results = list(executor.map(play_game, *zip(*jobs)))
+    elapsed = time.perf_counter() - started
+
+    a_side = [0 if game % 2 == 0 else 1 for game in range(games)]
+    for result, side in zip(results, a_side):
+        result["a_side"] = side
+
+    return {
+        "games": games,
+        "seconds": round(elapsed, 3),
+        "avg_plies": round(sum(result["plies"] for result in results) / games, 1) if games else None,
+        "engines": [summarize(engine_a, results, lambda game: game["a_side"]),
+                    summarize(engine_b, results, lambda game: 1 - game["a_side"])],
+        "peak_rss_kb": max([result["peak_rss_kb"] for result in results] +
+                           [resource.getrusage(resource.RUSAGE_SELF).ru_maxrss]),
+    }
+
+
+def engine_spec(spec: str) -> str:
+    # argparse type for engine specs, so a bad one is a usage error rather than a traceback
+    try:
+        Player(spec).close()
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error)) from None
+    return spec
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m helperClass.tournament",
+                                     description="Play engines against each other without a window and report "
+                                                 "win rates, move latency, nodes/sec and peak RSS as JSON.")
+    parser.add_argument("engine_a", type=engine_spec, help="minmax:D, id:D:T, ga or mcts:N")
+    parser.add_argument("engine_b", type=engine_spec)
+    parser.add_argument("-n", "--games", type=int, default=10)
+    parser.add_argument("-j", "--workers", type=int, default=None, help="processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--opening-plies", type=int, default=2, help="random plies before the engines take over")
+    parser.add_argument("--max-plies", type=int, default=200, help="games this long are draws")
+    args = parser.parse_args(argv)
+
+    report = run(args.engine_a, args.engine_b, args.games, args.workers, args.seed, args.opening_plies,
+                 args.max_plies)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
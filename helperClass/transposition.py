@@ -0,0 +1,115 @@
+from helperClass.engine import NO_MOVE
+
+# Bound types for stored search results
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Scores at or beyond this are wins/losses, see Automa.calculate_score
+WIN_SCORE = 100
+
+# A stored result counts this many plies shallower for every search since it was stored, see store()
+AGE_PLIES = 2
+
+
+class TranspositionTable:
+    # Fixed-size table of 2-slot buckets. Slot 0 keeps the deepest result seen for its bucket, slot 1 always takes
+    # the newest one, so memory never grows past 2 * 2**bits entries no matter how long the search runs.
+
+    def __init__(self, bits: int = 16):
+        self.mask = (1 << bits) - 1
+        size = 2 << bits
+
+        # Parallel flat lists rather than an entry object per slot
+        self.keys = [0] * size
+        self.depths = [-1] * size
+        self.flags = [EXACT] * size
+        self.values = [0] * size
+        self.moves = [NO_MOVE] * size
+        self.ages = [0] * size
+
+        # Bumped by new_search() so entries from earlier moves and games can be told apart
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        size = len(self.keys)
+        self.keys = [0] * size
+        self.depths = [-1] * size
+        self.flags = [EXACT] * size
+        self.values = [0] * size
+        self.moves = [NO_MOVE] * size
+        self.ages = [0] * size
+        self.generation = 0
+        self.reset_counters()
+
+    def new_search(self):
+        self.generation += 1
+
+    def reset_counters(self):
+        self.hits = self.misses = self.collisions = 0
+
+    def counters(self) -> dict:
+        used = sum(1 for depth in self.depths if depth >= 0)
+        return {"hits": self.hits, "misses": self.misses, "collisions": self.collisions,
+                "used": used, "size": len(self.keys), "generation": self.generation}
+
+    def probe(self, key: int):
+        # return: slot index holding key, or -1
+        slot = (key & self.mask) << 1
+        if self.keys[slot] == key and self.depths[slot] >= 0:
+            self.hits += 1
+            return slot
+        if self.keys[slot + 1] == key and self.depths[slot + 1] >= 0:
+            self.hits += 1
+            return slot + 1
+
+        # Bucket is holding other positions that share our index bits
+        if self.depths[slot] >= 0 or self.depths[slot + 1] >= 0:
+            self.collisions += 1
+        self.misses += 1
+        return -1
+
+    def lookup(self, key: int, depth: int):
+        # return: (flag, value, move) usable at this remaining depth, (None, None, move) when only the stored move
+        # is worth having, or None
+        slot = self.probe(key)
+        if slot < 0:
+            return None
+
+        move = self.moves[slot]
+        stored_depth = self.depths[slot]
+        if stored_depth < depth:
+            return None, None, move
+
+        # Wins are scored 100 + remaining depth, so a result from a deeper search has to be shifted down to what
+        # the same win would score from here. A win past our horizon still counts as a win.
+        value = self.values[slot]
+        if value >= WIN_SCORE:
+            value = max(value - stored_depth + depth, WIN_SCORE)
+        elif value <= -WIN_SCORE:
+            value = min(value + stored_depth - depth, -WIN_SCORE)
+        return self.flags[slot], value, move
+
+    def store(self, key: int, depth: int, flag: int, value, move: int):
+        slot = (key & self.mask) << 1
+
+        # Depth-preferred slot: take it for the same position, or when we searched at least as deep as its holder,
+        # whose depth is aged by AGE_PLIES per search since it was stored. Otherwise fall through to the
+        # always-replace slot.
+        age = self.generation - self.ages[slot]
+        if not (self.keys[slot] == key or depth >= self.depths[slot] - AGE_PLIES * age):
+            slot += 1
+
+        if self.keys[slot] == key and move == NO_MOVE:
+            move = self.moves[slot]
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.flags[slot] = flag
+        self.values[slot] = value
+        self.moves[slot] = move
+        self.ages[slot] = self.generation
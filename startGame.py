@@ -1,4 +1,5 @@
 import helperClass.game as gm
 
-mygame = gm.Game()
-mygame.run_game()
\ No newline at end of file
+if __name__ == "__main__":
+    mygame = gm.Game()
+    mygame.run_game()